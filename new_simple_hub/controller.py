@@ -6,6 +6,16 @@ import  utilities.now as now
 
 ROW = 10
 
+def dumps(obj):
+    """json.dumps without the default spaces - fewer bytes per ESP-NOW frame"""
+    return json.dumps(obj, separators=(',', ':'))
+
+# Fixed-shape ESP-NOW payloads, encoded once instead of json.dumps per call
+STOP_PAYLOAD = b'{"topic":"/game","value":-1}'
+PING_PAYLOAD = b'{"topic":"/ping","value":1}'
+NOTIFY_PAYLOAD = b'{"topic":"/notify","value":1}'
+GAME_PAYLOADS = {n: ('{"topic":"/game","value":%d}' % n).encode() for n in range(-1, 7)}
+
 class Control:
     def connect(self):
         def my_callback(msg, mac, rssi):
@@ -18,27 +28,27 @@ class Control:
         self.mac = self.n.wifi.config('mac')
         print(self.mac)
         
+        # /gem payload carries this controller's MAC - constant, so encode it once
+        encoded_string = ubinascii.b2a_base64(self.mac).decode('ascii')
+        self.gem_payload = dumps({'topic':'/gem', 'value':encoded_string})
+        
     def shutdown(self):
-        stop = json.dumps({'topic':'/game', 'value':-1})
-        self.n.publish(stop)
+        self.n.publish(STOP_PAYLOAD)
         
     def ping(self):
-        ping = json.dumps({'topic':'/ping', 'value':1})
-        self.n.publish(ping)
+        self.n.publish(PING_PAYLOAD)
         
     def notify(self):
-        note = json.dumps({'topic':'/notify', 'value':1})
-        self.n.publish(note)
+        self.n.publish(NOTIFY_PAYLOAD)
         print('notified')
         
     def choose(self, game):
-        encoded_bytes = ubinascii.b2a_base64(self.mac)
-        encoded_string = encoded_bytes.decode('ascii')
         time.sleep(0.5)
-        mac = json.dumps({'topic':'/gem', 'value':encoded_string})
-        self.n.publish(mac)
+        self.n.publish(self.gem_payload)
         time.sleep(0.5)
-        setup = json.dumps({'topic':'/game', 'value':game})
+        setup = GAME_PAYLOADS.get(game)
+        if setup is None:
+            setup = dumps({'topic':'/game', 'value':game})
         self.n.publish(setup)
 
 
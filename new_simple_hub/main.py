@@ -9,12 +9,11 @@ Hardware: ESP32-C6 with external antenna
 """
 
 import sys
-import select
 import json
 import time
 import asyncio
 import utilities.now as now
-from controller import Control
+from controller import Control, GAME_PAYLOADS, dumps
 
 # Try to import display support
 ROW_HEIGHT = 10  # Pixels per line on 128x64 display (can fit 6 lines)
@@ -38,6 +37,13 @@ GAME_MAP = {
     "Off": 6,          # Hibernate game → deep sleep
 }
 
+# Ack line sent back to the webapp, pre-formatted to skip json.dumps
+ACK_TEMPLATE = '{"type":"ack","command":"%s","status":"sent"}'
+
+# Webapp commands start with the "cmd" key, so its value can be sliced out
+CMD_PREFIX = b'{"cmd":'
+QUOTE = 34  # ord('"'); indexing bytes gives an int
+
 class SerialBridge:
     """Handle USB Serial communication with webapp"""
     
@@ -46,49 +52,55 @@ class SerialBridge:
         Initialize serial bridge
         
         Args:
-            command_callback: Function to call with (cmd_type, cmd_data)
+            command_callback: Function to call with cmd_type
             debug_callback: Function to call for debug messages
         """
         self.command_callback = command_callback
         self.debug = debug_callback
-        self.buffer = ""
+        
+        # Stream wrapper lets asyncio wait on stdin instead of polling it
+        # (binary stdin so readline() hands back whole lines as bytes)
+        self.reader = asyncio.StreamReader(sys.stdin.buffer)
     
     def send(self, data):
         """Send JSON message to webapp via Serial"""
         try:
-            msg = json.dumps(data)
+            msg = dumps(data)
             print(msg)  # Print to stdout (USB Serial) - JSON only!
         except Exception as e:
             self.debug("Ser TX Err")
     
-    def check_input(self):
-        """Check for incoming Serial data (non-blocking)"""
-        # Use select to check if stdin has data
-        rlist, _, _ = select.select([sys.stdin], [], [], 0)
-        
-        if rlist:
-            try:
-                # Read available data
-                chunk = sys.stdin.read(1)
-                if chunk:
-                    self.buffer += chunk
-                    
-                    # Check for complete lines
-                    while '\n' in self.buffer:
-                        line, self.buffer = self.buffer.split('\n', 1)
-                        line = line.strip()
-                        
-                        if line:
-                            self._process_command(line)
-            except Exception as e:
-                self.debug("Ser RX Err")
+    def send_line(self, line):
+        """Send an already-encoded JSON line to webapp"""
+        print(line)
+    
+    async def check_input(self):
+        """Wait for a complete Serial line and process it"""
+        try:
+            # Suspends until stdin is readable, then reads the whole line at once
+            line = await self.reader.readline()
+            line = line.strip()
+            
+            if line:
+                self._process_command(line)
+        except Exception as e:
+            self.debug("Ser RX Err")
     
     def _process_command(self, line):
         """Parse JSON command and call callback"""
         try:
+            # Fast path: read the command name without a full json.loads
+            # Only a string value right after the prefix qualifies; anything
+            # else (null, numbers, spacing, escapes) goes through json.loads
+            start = len(CMD_PREFIX) + 1
+            if line.startswith(CMD_PREFIX) and len(line) > start and line[start - 1] == QUOTE:
+                end = line.find(b'"', start)
+                if end > 0 and line.find(b'\\', start, end) < 0:
+                    self.command_callback(line[start:end].decode())
+                    return
+            
             cmd = json.loads(line)
-            cmd_type = cmd.get("cmd")
-            self.command_callback(cmd_type, cmd)
+            self.command_callback(cmd.get("cmd"))
         except Exception as e:
             self.debug("CMD Err")
 
@@ -169,6 +181,18 @@ class SimpleHub(Control):
             debug_callback=self._debug
         )
         
+        # Command table built once ("Off" is in GAME_MAP → Hibernate):
+        # name -> (game number, display text, pre-formatted ack line)
+        self._commands = {}
+        for name, game_num in GAME_MAP.items():
+            # Show game name (truncate to fit 12 char limit: "Gm:" + 9 chars)
+            game_display = name[:9] if len(name) <= 9 else name[:8] + "."
+            self._commands[name] = (game_num, f"Gm:{game_display}", ACK_TEMPLATE % name)
+        
+        # Outgoing game command waiting for the publisher task (newest wins)
+        self._pending = None
+        self._publish_ready = asyncio.Event()
+        
         self._debug("Hub Init")
     
     def _debug(self, msg):
@@ -186,7 +210,7 @@ class SimpleHub(Control):
         # Add C6 external antenna configuration
         self.n.antenna()
         
-        mac_str = ':'.join(f'{b:02x}' for b in self.mac)
+        mac_str = self.n.mac_str(self.mac)
         self._debug(f"MAC:{mac_str[-8:]}")
         self._debug("NOW Ready")
         
@@ -196,36 +220,43 @@ class SimpleHub(Control):
             "mac": mac_str
         })
     
-    def _handle_command(self, cmd_type, cmd):
+    def _handle_command(self, cmd_type):
         """Handle command from webapp (callback from SerialBridge)"""
-        if cmd_type in GAME_MAP:
-            # Send game command using inherited choose() method
-            game_num = GAME_MAP[cmd_type]
-            # Show game name (truncate to fit 12 char limit: "Gm:" + 9 chars)
-            game_display = cmd_type[:9] if len(cmd_type) <= 9 else cmd_type[:8] + "."
-            self._debug(f"Gm:{game_display}")
-            self.choose(game_num)
-            
-            # Send acknowledgment to webapp
-            self.serial.send({
-                "type": "ack",
-                "command": cmd_type,
-                "status": "sent"
-            })
-        
-        elif cmd_type == "Off":
-            # Use inherited shutdown() method
-            self.shutdown()
-            self.serial.send({
-                "type": "ack",
-                "command": "Off",
-                "status": "sent"
-            })
-        
-        else:
+        entry = self._commands.get(cmd_type)
+        if entry is None:
             # Show unknown command (truncate to fit)
             unk_display = str(cmd_type)[:8] if cmd_type else "None"
             self._debug(f"Unk:{unk_display}")
+            return
+        
+        # Hand the game command to the publisher task
+        game_num, game_display, ack = entry
+        self._debug(game_display)
+        self._pending = (game_num, ack)
+        self._publish_ready.set()
+    
+    async def _publisher(self):
+        """Single writer for ESP-NOW game commands
+        
+        Commands that arrive while a send is in progress replace each other,
+        so only the newest one is broadcast once the current send finishes.
+        """
+        while self.running:
+            await self._publish_ready.wait()
+            self._publish_ready.clear()
+            pending, self._pending = self._pending, None
+            if pending is None:
+                continue
+            game_num, ack = pending
+            
+            # Same sequence as Control.choose(), without blocking the event loop
+            await asyncio.sleep(0.5)
+            self.n.publish(self.gem_payload)
+            await asyncio.sleep(0.5)
+            self.n.publish(GAME_PAYLOADS[game_num])
+            
+            # Send acknowledgment to webapp
+            self.serial.send_line(ack)
     
     async def run(self):
         """Main event loop"""
@@ -235,18 +266,17 @@ class SimpleHub(Control):
         self._debug("Running")
         self._debug("Wait CMD")
         
+        publisher = asyncio.create_task(self._publisher())
         try:
             while self.running:
-                # Check for Serial commands
-                self.serial.check_input()
-                
-                # Small delay for responsiveness
-                await asyncio.sleep(0.01)
+                # Wait for Serial commands (loop sleeps until data arrives)
+                await self.serial.check_input()
         
         except KeyboardInterrupt:
             self._debug("Stopping")
         
         finally:
+            publisher.cancel()
             self.close()
     
     def close(self):
@@ -6,6 +6,10 @@ import  utilities.now as now
 
 ROW = 10
 
+def dumps(obj):
+    """json.dumps without the default spaces - fewer bytes per ESP-NOW frame"""
+    return json.dumps(obj, separators=(',', ':'))
+
 class Control:
     def connect(self):
         def my_callback(msg, mac, rssi):
@@ -19,15 +23,15 @@ class Control:
         print(self.mac)
         
     def shutdown(self):
-        stop = json.dumps({'topic':'/game', 'value':-1})
+        stop = dumps({'topic':'/game', 'value':-1})
         self.n.publish(stop)
         
     def ping(self):
-        ping = json.dumps({'topic':'/ping', 'value':1})
+        ping = dumps({'topic':'/ping', 'value':1})
         self.n.publish(ping)
         
     def notify(self):
-        note = json.dumps({'topic':'/notify', 'value':1})
+        note = dumps({'topic':'/notify', 'value':1})
         self.n.publish(note)
         print('notified')
         
@@ -35,10 +39,10 @@ class Control:
         encoded_bytes = ubinascii.b2a_base64(self.mac)
         encoded_string = encoded_bytes.decode('ascii')
         time.sleep(0.5)
-        mac = json.dumps({'topic':'/gem', 'value':encoded_string})
+        mac = dumps({'topic':'/gem', 'value':encoded_string})
         self.n.publish(mac)
         time.sleep(0.5)
-        setup = json.dumps({'topic':'/game', 'value':game})
+        setup = dumps({'topic':'/game', 'value':game})
         self.n.publish(setup)
 
 
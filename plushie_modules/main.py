@@ -2,8 +2,8 @@ import time
 import asyncio
 import json
 import ubinascii
-
-from collections import deque
+import array
+from micropython import const
 
 import utilities.utilities as utilities
 import utilities.lights as lights
@@ -11,13 +11,18 @@ import utilities.now as now
 import utilities.i2c_bus as i2c_bus
 from utilities.colors import *
 
-from games.sound import Notes
-from games.shake import Shake
-from games.jump import Jump
-from games.hotcold import Hot_cold
-from games.clap import Clap
-from games.rainbow import Rainbow
-from games.hibernate import Hibernate
+# Games in number order as (module, class); each is imported on first start
+GAMES = (('games.sound', 'Notes'), ('games.shake', 'Shake'), ('games.hotcold', 'Hot_cold'),
+         ('games.jump', 'Jump'), ('games.clap', 'Clap'), ('games.rainbow', 'Rainbow'),
+         ('games.hibernate', 'Hibernate'))
+
+_DEBUG = const(0)     # set to 1 for per-packet prints (costly over UART)
+
+# Hub sends /game in this exact compact form, so the value can be sliced out
+GAME_PREFIX = b'{"topic":"/game","value":'
+
+QUEUE_SIZE = 20      # ring buffer slots (one is kept empty to tell full from empty)
+MSG_SIZE = 250       # ESP-NOW maximum payload
 
 class Stuffie:
     def __init__(self):
@@ -30,7 +35,15 @@ class Stuffie:
         self.value = -1
         self.task = None
         self.hidden_gem = None
-        self.queue = deque([], 20)
+        self.rssi = None
+        
+        # Preallocated ring buffer so the ESP-NOW callback never allocates
+        self._msgs = [bytearray(MSG_SIZE) for _ in range(QUEUE_SIZE)]
+        self._msg_lens = array.array('H', [0] * QUEUE_SIZE)
+        self._head = 0
+        self._tail = 0
+        self._peers = None
+        self._pkt_flag = asyncio.ThreadSafeFlag()   # set by the ESP-NOW irq
 
         self.lights = lights.Lights()
         self.lights.default_color = GREEN
@@ -44,8 +57,9 @@ class Stuffie:
         self.buzzer.stop()
         self.hibernate = utilities.Hibernate()
         
-        self.game_names = [Notes(self), Shake(self), Hot_cold(self), Jump(self), Clap(self), Rainbow(self), Hibernate(self)]
+        self.game_names = [None] * len(GAMES)
         self.response_times = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1]
+        self.topic_handlers = {'/gem': self.set_gem, '/game': self.change_game}
 
     def startup(self):
         print('Starting up')
@@ -68,13 +82,28 @@ class Stuffie:
         print('starting game ', number)
         self.running = True
         self.game = number
-        self.task = asyncio.create_task(self.game_names[number].run(self.response_times[number]))
+        self.task = asyncio.create_task(self.load_game(number).run(self.response_times[number]))
         print(f'started {number}')
         
+    def load_game(self, number):
+        game = self.game_names[number]
+        if game is None:
+            module_name, class_name = GAMES[number]
+            module = __import__(module_name, None, None, (class_name,))
+            game = self.game_names[number] = getattr(module, class_name)(self)
+        return game
+        
     async def stop_game(self, number):
         print(f'trying to stop {number}')
         self.running = False
-        await self.task
+        if self.task:
+            # Don't wait for the game to notice running went False
+            self.task.cancel()
+            try:
+                await asyncio.wait_for(self.task, 0.2)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                pass
+            self.task = None
 
     def close(self):
         if self.game >= 0:
@@ -84,67 +113,106 @@ class Stuffie:
         self.buzzer.stop()
 
     def now_callback(self, msg, mac, rssi):
-        self.queue.append((mac, msg, rssi))
+        head = self._head
+        next_head = (head + 1) % QUEUE_SIZE
+        if next_head == self._tail:
+            # queue full - drop the oldest packet, as the old deque(maxlen) did
+            self._tail = (self._tail + 1) % QUEUE_SIZE
+        n = len(msg)
+        self._msgs[head][:n] = msg
+        self._msg_lens[head] = n
+        self._peers = rssi      # ESP-NOW peers table (same dict every call)
+        self._head = next_head
+        self._pkt_flag.set()
+        
+    def queued(self):
+        return (self._head - self._tail) % QUEUE_SIZE
             
-    async def pop_queue(self):
-        if not len(self.queue):
-            return
+    def parse_queue(self):
+        """
+        Pop the oldest packet; returns (topic, value), or None for pings and errors
+        """
+        tail = self._tail
+        if tail == self._head:
+            return None
+        msg = bytes(memoryview(self._msgs[tail])[:self._msg_lens[tail]])
+        self._tail = (tail + 1) % QUEUE_SIZE
+        if b'"/ping"' in msg:
+            self.rssi = self._peers
+            return None
+        
+        # Cheap guard so stray packets never reach json.loads
+        if b'"topic"' not in msg or b'"value"' not in msg:
+            return None
         try:
-            (mac, msg, rssi) = self.queue.pop()
+            if msg.startswith(GAME_PREFIX):
+                return '/game', int(msg[len(GAME_PREFIX):msg.index(b'}')])
             payload = json.loads(msg)
-            topic = payload['topic']
-            value = payload['value']
-
-            if topic == '/ping':
-                self.rssi = rssi
-                return
-            else:
-                #print(mac, msg, rssi)
-                self.lights.all_on(GREEN)
-                print(topic)
-                await self.execute_queue(topic, value, self.game)
-                self.lights.all_off()
-            
-        except Exception as e:
+        except ValueError as e:
             print('pop error ',e)
+            return None
+        
+        if not isinstance(payload, dict):
+            return None
+        topic = payload.get('topic')
+        value = payload.get('value')
+        if topic is None or value is None:
+            return None
+        return topic, value
+            
+    async def handle_message(self, topic, value):
+        self.lights.all_on(GREEN)
+        if _DEBUG: print(topic)
+        await self.execute_queue(topic, value, self.game)
+        self.lights.all_off()
                 
     async def execute_queue(self, topic, value, game):
-        print('running queue', topic, value, game)
+        if _DEBUG: print('running queue', topic, value, game)
         try:
-            if topic == "/gem": 
-                bytes_from_string = value.encode('ascii')
-                gem_mac = ubinascii.a2b_base64(bytes_from_string)
-                print('hidden gem = ',gem_mac)
-                self.hidden_gem = gem_mac
-            
-            if topic == '/game':
-                if value != game:
-                    print('Game ',value)
-                    if game >= 0:
-                        await self.stop_game(game)
-                        await self.lights.animate(RED,timeout = 0, speed = 0.03)
-                    #self.game = self.value
-                    if value >= 0:
-                        print('starting game ',value)
-                        await self.lights.animate(COLORS[value],timeout = 0, speed = 0.03)
-                        self.start_game(value)
-                else:
-                    print('notifying')
-                    topic = '/notify'
+            handler = self.topic_handlers.get(topic)
+            if handler:
+                topic = await handler(topic, value, game)
             self.topic =  topic
             self.value = value
         except Exception as e:
             print(e)
+            
+    async def set_gem(self, topic, value, game):
+        bytes_from_string = value.encode('ascii')
+        gem_mac = ubinascii.a2b_base64(bytes_from_string)
+        print('hidden gem = ',gem_mac)
+        self.hidden_gem = gem_mac
+        return topic
+        
+    async def change_game(self, topic, value, game):
+        if value != game:
+            print('Game ',value)
+            if game >= 0:
+                await self.stop_game(game)
+                await self.lights.animate(RED,timeout = 0, speed = 0.03)
+            #self.game = self.value
+            if value >= 0:
+                print('starting game ',value)
+                await self.lights.animate(COLORS[value],timeout = 0, speed = 0.03)
+                self.start_game(value)
+            return topic
+        print('notifying')
+        return '/notify'
                     
     async def main(self):
         try:
             self.startup()
             self.start_game(0)
             while self.game >= 0:
-                print(len(self.queue),' ',end='')
-                while len(self.queue):
-                    await self.pop_queue()
-                await asyncio.sleep(0.1)
+                if _DEBUG: print(self.queued(),' ',end='')
+                # Drain every queued packet before sleeping; pings are handled
+                # inline without creating a coroutine per packet
+                while self.queued():
+                    rec = self.parse_queue()
+                    if rec is not None:
+                        await self.handle_message(*rec)
+                # Sleep until now_callback queues the next packet
+                await self._pkt_flag.wait()
         except Exception as e:
             print('main error: ',e)
         finally:
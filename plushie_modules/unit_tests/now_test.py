@@ -5,9 +5,9 @@ import utilities.base64 as base64
 
 
 def now_callback(msg, mac, rssi):
-    print(mac, msg.decode('utf-8') , rssi)
+    print(mac, msg , rssi)
     try:
-        payload = json.loads(msg.decode('utf-8'))
+        payload = json.loads(msg)   # json.loads takes the bytes as-is
         topic = payload['topic']
         value = payload['value']
         print(payload)
@@ -8,10 +8,8 @@ import utilities.i2c_bus as i2c_bus
 def button_test():
     print('Testing the button - click it any time')
     button = utilities.Button()
-    while not button.pressed:
-        print('.', end='')
-        time.sleep(0.1)
-    print('')
+    asyncio.run(button.wait_pressed())
+    print('pressed')
 
 def motor_test():
     print('Testing the motor - haptic feedback')
@@ -20,10 +18,13 @@ def motor_test():
     
 def buzzer_test():
     print('Testing the buzzer playing A4 for 2 sec')
-    buzzer = utilities.Buzzer()
-    buzzer.play(440)
-    time.sleep(2)
-    buzzer.stop()
+    async def main():
+        buzzer = utilities.Buzzer()
+        buzzer.play(440)
+        await asyncio.sleep(2)
+        buzzer.stop()
+    
+    asyncio.run(main())
 
 def light_test():
     print('Testing the neopixels - animate red then only 5 leds in purple twice')
@@ -31,8 +32,9 @@ def light_test():
         a = lights.Lights()
         a.default_intensity = 0.1
         a.default_color = lights.RED
-        await a.animate()
-        await a.animate(color = lights.PURPLE, intensity = 0.2, number = 5, repeat= 2, timeout = 2.0, speed = 0.5)
+        # Scheduled together; the Lights lock keeps them in order on one strip
+        await asyncio.gather(a.animate(),
+                             a.animate(color = lights.PURPLE, intensity = 0.2, number = 5, repeat= 2, timeout = 2.0, speed = 0.5))
     
     asyncio.run(main())
 
@@ -12,6 +12,7 @@ class Lights():
         self.np = neopixel.NeoPixel(Pin(LED_PIN), NUM_LED)
         self.default_color = RED
         self.default_intensity = 1
+        self.lock = asyncio.Lock()   # one animation owns the strip at a time
         
     def defaults(self, color = None, intensity = None):
         color = color if color else self.default_color
@@ -40,16 +41,17 @@ class Lights():
         
     async def animate(self, color = None, intensity = None, number = NUM_LED, repeat= 1, timeout = 1.0, speed = 0.1):
         color, intensity = self.defaults(color, intensity)
-        for j in range(repeat):
-            for i in range(number):
-                self.on(i, color, intensity)
-                self.off(i+1)
-                await asyncio.sleep(speed)
-            
-        if timeout > 0.0:
-            #turn off all LEDs
-            await asyncio.sleep(timeout)
-            self.all_off()
+        async with self.lock:
+            for j in range(repeat):
+                for i in range(number):
+                    self.on(i, color, intensity)
+                    self.off(i+1)
+                    await asyncio.sleep(speed)
+                
+            if timeout > 0.0:
+                #turn off all LEDs
+                await asyncio.sleep(timeout)
+                self.all_off()
 
     def show_number(self, number, color = None, intensity = None):
         color, intensity = self.defaults(color, intensity)
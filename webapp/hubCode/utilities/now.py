@@ -9,10 +9,19 @@ class Now():
         self.everyone = b'\xff\xff\xff\xff\xff\xff'    # talk to all mac addresses
         self.callback = callback if callback else self.default
         self.peers = []
+        self.mac_strings = {}   # mac bytes -> "aa:bb:..", formatted once per peer
+    
+    def mac_str(self, mac):
+        # irecv() hands back a reused bytearray, so key with an immutable copy
+        key = bytes(mac)
+        s = self.mac_strings.get(key)
+        if s is None:
+            s = ':'.join('%02x' % b for b in key)
+            self.mac_strings[key] = s
+        return s
     
     def default(self, msg, mac, rssi):
-        mac_str = ':'.join(f'{b:02x}' for b in mac)
-        print(msg.decode(),' - ',mac_str, 'rssi = ',rssi)
+        print(msg.decode(),' - ',self.mac_str(mac), 'rssi = ',rssi)
         
     def antenna(self):
         ##Changing from internal to external antenna
@@ -2,6 +2,7 @@ from machine import Pin, PWM, deepsleep
 import machine 
 import esp32
 import time
+import asyncio
 
 BUTTON_PIN = 0
 BUZZER_PIN = 19
@@ -15,6 +16,7 @@ class Button:
         self.old_pressed_time = 0
         self.time_of_button_released = 0
         self.flag = False
+        self.press_flag = asyncio.ThreadSafeFlag()   # set from the IRQ on each press
 
         self.button = Pin(BUTTON_PIN, Pin.IN, Pin.PULL_UP)
         self.button.irq(handler=self.update, trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING)       
@@ -30,6 +32,7 @@ class Button:
             return
         if press:  #if pressed
             self.time_of_button_press = time.ticks_ms()
+            self.press_flag.set()
             self.motor.run(0.08)
         else:  #if released
             if(time.ticks_ms() - self.time_of_button_press) > 10000:
@@ -40,6 +43,14 @@ class Button:
         if self.callback: self.callback
         self.flag = False
 
+    async def wait_pressed(self):
+        """
+        Wait for the next button press without polling
+        """
+        if self.pressed: return
+        self.press_flag.clear()     # ignore presses that happened before the call
+        await self.press_flag.wait()
+
 class Motor:
     def __init__(self):
         self.motor = Pin(MOTOR_PIN, Pin.OUT)
@@ -7,6 +7,10 @@
  * Used by: mpy/hub_bluetooth.py
  */
 
+// Shared encoder - created once instead of on every write
+const textEncoder = new TextEncoder();
+const STREAM_DECODE = { stream: true };
+
 export const BluetoothAdapter = {
   // Nordic UART Service UUIDs (lowercase for Web Bluetooth API)
   SERVICE_UUID: '6e400001-b5a3-f393-e0a9-e50e24dcca9e',
@@ -141,7 +145,7 @@ export const BluetoothAdapter = {
     try {
       // Convert string to Uint8Array if needed
       const bytes = typeof data === 'string'
-        ? new TextEncoder().encode(data)
+        ? textEncoder.encode(data)
         : data;
 
       await this.rxCharacteristic.writeValue(bytes);
@@ -165,10 +169,16 @@ export const BluetoothAdapter = {
     try {
       this.notificationCallback = callback;
 
+      // One stream decoder per connection: a character cut off when the last
+      // link dropped must not be glued onto the first notification of the next
+      const decoder = new TextDecoder();
+
       // Set up notification handler
       this.txCharacteristic.addEventListener('characteristicvaluechanged', (event) => {
         const value = event.target.value; // DataView
-        const text = new TextDecoder().decode(value);
+        // Stream mode holds back a multi-byte character split across two
+        // notifications instead of decoding each half to U+FFFD
+        const text = decoder.decode(value, STREAM_DECODE);
         
         if (this.notificationCallback) {
           this.notificationCallback(text);
@@ -7,10 +7,27 @@
  * Used by: mpy/hub_serial.py
  */
 
+// Shared codecs - created once instead of on every read/write
+const textEncoder = new TextEncoder();
+const textDecoder = new TextDecoder();
+
+// Size of the reusable buffer for the continuous read loop
+const READ_BUFFER_SIZE = 4096;
+
+// A partial line longer than this is garbage (no newline in sight) and is dropped
+const MAX_LINE_LENGTH = 64 * 1024;
+const STREAM_DECODE = { stream: true };
+
+// localStorage key for the USB IDs of the port the user picked last, so a
+// page reload can reattach to it through navigator.serial.getPorts()
+const PORT_INFO_KEY = 'serialAdapter.lastPortInfo';
+
 export const SerialAdapter = {
   port: null,
+  lastPort: null, // Port the user picked, kept until a deliberate disconnect
   reader: null,
   writer: null,
+  debug: false, // Log every read/write and reader lock (slow on chatty links)
 
   /**
    * Check if serial port is connected
@@ -47,6 +64,8 @@ export const SerialAdapter = {
       // Open port with 115200 baud (standard for ESP32)
       await this.port.open({ baudRate: 115200 });
       console.log('Port opened at 115200 baud');
+      this.lastPort = this.port;
+      this.rememberPortInfo(this.port);
 
       console.log('Serial connected successfully');
       return true;
@@ -72,12 +91,88 @@ export const SerialAdapter = {
     }
   },
 
+  /**
+   * Reopen the port the user picked last without showing the picker: the
+   * same SerialPort after the link was lost (cable unplugged, board reset),
+   * or after a page reload the one granted port whose USB vendor/product IDs
+   * match the saved ones. Several matching ports are ambiguous and need the
+   * picker, as does any connect after a deliberate disconnect().
+   * @returns {Promise<boolean>} True if the remembered port was opened
+   */
+  async tryReattach() {
+    let port = this.lastPort;
+    if (!port) {
+      port = await this.findRememberedPort();
+      if (!port) return false;
+    }
+
+    try {
+      if (port.readable) {
+        // Still open from before the loss - close it so it can be reopened cleanly
+        await port.close();
+      }
+      await port.open({ baudRate: 115200 });
+    } catch (error) {
+      // Unplugged or in use by another tab - fall back to the picker
+      console.warn('Serial reattach failed:', error);
+      return false;
+    }
+    this.port = port;
+    this.lastPort = port;
+    console.log('Serial reattached to the last used port');
+    return true;
+  },
+
+  /**
+   * Find the single granted port matching the saved USB IDs
+   * @returns {Promise<SerialPort|null>} null if none or more than one match
+   */
+  async findRememberedPort() {
+    if (!navigator.serial) return null;
+
+    let saved = null;
+    try {
+      saved = JSON.parse(localStorage.getItem(PORT_INFO_KEY));
+    } catch (error) {
+      // Unreadable entry - treat as nothing saved
+    }
+    if (!saved || saved.usbVendorId === undefined) return null;
+
+    const ports = await navigator.serial.getPorts();
+    const matches = ports.filter((port) => {
+      const info = port.getInfo();
+      return info.usbVendorId === saved.usbVendorId &&
+        info.usbProductId === saved.usbProductId;
+    });
+    return matches.length === 1 ? matches[0] : null;
+  },
+
+  /**
+   * Save (or with null, forget) the USB IDs of the port the user picked
+   * @param {SerialPort|null} port
+   */
+  rememberPortInfo(port) {
+    try {
+      if (port) {
+        localStorage.setItem(PORT_INFO_KEY, JSON.stringify(port.getInfo()));
+      } else {
+        localStorage.removeItem(PORT_INFO_KEY);
+      }
+    } catch (error) {
+      // Storage disabled (private mode) - reattach after reload just won't happen
+    }
+  },
+
   /**
    * Disconnect from serial port
    * @returns {Promise<boolean>}
    */
   async disconnect() {
     try {
+      // A deliberate disconnect forgets the port, so the next connect shows the picker
+      this.lastPort = null;
+      this.rememberPortInfo(null);
+
       // Release locks first
       await this.releaseReader();
       await this.releaseWriter();
@@ -103,13 +198,13 @@ export const SerialAdapter = {
    */
   async getReader() {
     if (!this.port || !this.port.readable) {
-      console.error('❌ [SerialAdapter] getReader() failed: Port not available or not readable');
-      console.log('  Port exists:', !!this.port);
-      console.log('  Port readable:', this.port ? !!this.port.readable : 'N/A');
+      console.error('❌ [SerialAdapter] getReader() failed: Port not available or not readable\n' +
+        `  Port exists: ${!!this.port}\n` +
+        `  Port readable: ${this.port ? !!this.port.readable : 'N/A'}`);
       throw new Error('Port not available or not open');
     }
 
-    console.log('🔒 [SerialAdapter] Acquiring reader lock');
+    if (this.debug) console.log('🔒 [SerialAdapter] Acquiring reader lock');
     this.reader = this.port.readable.getReader();
     return this.reader;
   },
@@ -121,7 +216,7 @@ export const SerialAdapter = {
   async releaseReader() {
     if (this.reader) {
       try {
-        console.log('🔓 [SerialAdapter] Releasing reader lock');
+        if (this.debug) console.log('🔓 [SerialAdapter] Releasing reader lock');
         await this.reader.cancel();
         this.reader.releaseLock();
       } catch (error) {
@@ -176,19 +271,21 @@ export const SerialAdapter = {
     try {
       // Convert string to Uint8Array if needed
       const bytes = typeof data === 'string' 
-        ? new TextEncoder().encode(data)
+        ? textEncoder.encode(data)
         : data;
 
-      // Debug logging
-      if (typeof data === 'string') {
-        const printable = data
-          .replace(/\x03/g, '<CTRL-C>')
-          .replace(/\x04/g, '<CTRL-D>')
-          .replace(/\x01/g, '<CTRL-A>')
-          .replace(/\x02/g, '<CTRL-B>');
-        console.log(`📤 [SerialAdapter] Writing ${bytes.length} bytes:`, printable.substring(0, 100));
-      } else {
-        console.log(`📤 [SerialAdapter] Writing ${bytes.length} bytes (binary)`);
+      // Debug logging (skipped entirely so the printable copy is never built)
+      if (this.debug) {
+        if (typeof data === 'string') {
+          const printable = data
+            .replace(/\x03/g, '<CTRL-C>')
+            .replace(/\x04/g, '<CTRL-D>')
+            .replace(/\x01/g, '<CTRL-A>')
+            .replace(/\x02/g, '<CTRL-B>');
+          console.log(`📤 [SerialAdapter] Writing ${bytes.length} bytes:`, printable.substring(0, 100));
+        } else {
+          console.log(`📤 [SerialAdapter] Writing ${bytes.length} bytes (binary)`);
+        }
       }
 
       await writer.write(bytes);
@@ -198,6 +295,34 @@ export const SerialAdapter = {
     }
   },
 
+  /**
+   * Write data and wait until the port can take more (stream backpressure)
+   * @param {string|Uint8Array} data - Data to write
+   * @returns {Promise<void>}
+   */
+  async writeAndDrain(data) {
+    if (!this.isConnected()) {
+      console.error('❌ [SerialAdapter] writeAndDrain() failed: Not connected');
+      throw new Error('Not connected to serial port');
+    }
+
+    const writer = await this.getWriter();
+
+    try {
+      const bytes = typeof data === 'string'
+        ? textEncoder.encode(data)
+        : data;
+
+      if (this.debug) console.log(`📤 [SerialAdapter] Writing ${bytes.length} bytes (drained)`);
+
+      await writer.write(bytes);
+      await writer.ready;
+
+    } finally {
+      await this.releaseWriter();
+    }
+  },
+
   /**
    * Read data from serial port with timeout
    * @param {number} timeoutMs - Timeout in milliseconds (default 2000)
@@ -227,8 +352,8 @@ export const SerialAdapter = {
       }
 
       // Decode and return
-      const text = new TextDecoder().decode(result.value);
-      if (text) {
+      const text = textDecoder.decode(result.value);
+      if (text && this.debug) {
         console.log(`📥 [SerialAdapter] Read ${text.length} bytes:`, text.substring(0, 100));
       }
       return text;
@@ -236,7 +361,7 @@ export const SerialAdapter = {
     } catch (error) {
       // Timeout is expected, return empty string
       if (error.message === 'timeout') {
-        console.log(`⏱️ [SerialAdapter] Read timeout after ${timeoutMs}ms`);
+        if (this.debug) console.log(`⏱️ [SerialAdapter] Read timeout after ${timeoutMs}ms`);
         return '';
       }
       console.error('❌ [SerialAdapter] Read error:', error);
@@ -255,15 +380,23 @@ export const SerialAdapter = {
    */
   async readUntil(expected, timeoutMs = 5000) {
     const startTime = Date.now();
-    let buffer = '';
+    // Chunks are joined once at the end; only the newest chunk (plus enough of
+    // the previous one to catch a split marker) is searched each time
+    const parts = [];
+    const overlap = expected.length - 1;
+    let tail = '';
 
     while ((Date.now() - startTime) < timeoutMs) {
       try {
         const chunk = await this.read(500);
-        buffer += chunk;
 
-        if (buffer.includes(expected)) {
-          return { found: true, buffer };
+        if (chunk) {
+          parts.push(chunk);
+          const recent = tail + chunk;
+          if (recent.includes(expected)) {
+            return { found: true, buffer: parts.join('') };
+          }
+          tail = recent.slice(Math.max(0, recent.length - overlap));
         }
 
         // No data and approaching timeout
@@ -277,20 +410,241 @@ export const SerialAdapter = {
       }
     }
 
-    return { found: false, buffer };
+    return { found: false, buffer: parts.join('') };
+  },
+
+  /**
+   * Read everything that arrives until any marker is seen or the deadline passes.
+   * Holds one reader lock for the whole drain, so the caller makes a single
+   * await instead of one read() round-trip per chunk.
+   * @param {number} timeoutMs - Total time to wait in milliseconds
+   * @param {string[]} markers - Strings that end the read as soon as one appears
+   * @returns {Promise<{found: boolean, buffer: string}>}
+   */
+  async readUntilDeadline(timeoutMs, markers) {
+    if (!this.isConnected()) {
+      console.error('❌ [SerialAdapter] readUntilDeadline() failed: Not connected');
+      throw new Error('Not connected to serial port');
+    }
+
+    const deadline = Date.now() + timeoutMs;
+    const reader = await this.getReader();
+    // Same accumulation as readUntil: join once, search only the recent tail
+    const parts = [];
+    const overlap = Math.max(0, ...markers.map((marker) => marker.length)) - 1;
+    let tail = '';
+
+    try {
+      let remaining = timeoutMs;
+      // One read is always in flight, so the port is never left idle while a
+      // chunk is decoded and searched (releaseReader cancels the last one)
+      let pending = reader.read();
+      while (remaining > 0) {
+        let timer;
+        const result = await Promise.race([
+          pending,
+          new Promise((resolve) => {
+            timer = setTimeout(() => resolve(null), remaining);
+          })
+        ]);
+        clearTimeout(timer);
+
+        // Deadline passed or stream closed - hand back what we have
+        if (result === null || result.done) break;
+        pending = reader.read();
+
+        const chunk = textDecoder.decode(result.value);
+        parts.push(chunk);
+        const recent = tail + chunk;
+        for (const marker of markers) {
+          if (recent.includes(marker)) {
+            return { found: true, buffer: parts.join('') };
+          }
+        }
+        tail = recent.slice(Math.max(0, recent.length - overlap));
+        remaining = deadline - Date.now();
+      }
+
+      if (this.debug) console.log(`⏱️ [SerialAdapter] readUntilDeadline timeout after ${timeoutMs}ms`);
+      return { found: false, buffer: parts.join('') };
+
+    } finally {
+      await this.releaseReader();
+    }
+  },
+
+  /**
+   * Write data, then read until any marker is seen or the deadline passes -
+   * a whole REPL turnaround (e.g. code + Ctrl-D up to "\x04>") in one call
+   * @param {string|Uint8Array} data - Data to write
+   * @param {number} timeoutMs - Time to wait for a marker after the write
+   * @param {string[]} markers - Strings that end the read as soon as one appears
+   * @returns {Promise<{found: boolean, buffer: string}>}
+   */
+  async writeAndReadUntil(data, timeoutMs, markers) {
+    await this.write(data);
+    return this.readUntilDeadline(timeoutMs, markers);
+  },
+
+  /**
+   * Run code through MicroPython's raw-paste mode (Ctrl-E A Ctrl-A from the
+   * raw REPL prompt). The device grants a byte window and acks each refill
+   * with \x01, so the code streams without echo and without overrunning the
+   * device's input buffer. Holds one reader and one writer for the exchange.
+   * @param {string|Uint8Array} code - Python code to execute (or its UTF-8 bytes)
+   * @param {number} timeoutMs - Total timeout in milliseconds
+   * @returns {Promise<{supported: boolean, found: boolean, buffer: string}>}
+   *   buffer is the "<stdout>\x04<stderr>\x04>" reply; supported is false
+   *   when the device refused raw-paste or never answered the handshake
+   */
+  async rawPaste(code, timeoutMs = 5000) {
+    if (!this.isConnected()) {
+      console.error('❌ [SerialAdapter] rawPaste() failed: Not connected');
+      throw new Error('Not connected to serial port');
+    }
+
+    const deadline = Date.now() + timeoutMs;
+    const reader = await this.getReader();
+    const writer = await this.getWriter();
+
+    // Pending bytes from the last read, consumed one control byte at a time
+    let chunk = new Uint8Array(0);
+    let pos = 0;
+
+    const fill = async () => {
+      let timer;
+      const result = await Promise.race([
+        reader.read(),
+        new Promise((resolve) => {
+          timer = setTimeout(() => resolve(null), Math.max(0, deadline - Date.now()));
+        })
+      ]);
+      clearTimeout(timer);
+      if (result === null || result.done) throw new Error('Raw-paste timeout');
+      chunk = result.value;
+      pos = 0;
+    };
+
+    const readByte = async () => {
+      while (pos >= chunk.length) await fill();
+      return chunk[pos++];
+    };
+
+    // Decoded text from the current position until the marker (or deadline)
+    const readText = async (marker) => {
+      const parts = [textDecoder.decode(chunk.subarray(pos))];
+      let recent = parts[0];
+      pos = chunk.length;
+      while (!recent.includes(marker)) {
+        try {
+          await fill();
+        } catch (e) {
+          return { found: false, buffer: parts.join('') };
+        }
+        const text = textDecoder.decode(chunk);
+        pos = chunk.length;
+        parts.push(text);
+        recent = recent.slice(-marker.length) + text;
+      }
+      return { found: true, buffer: parts.join('') };
+    };
+
+    try {
+      await writer.write(textEncoder.encode('\x05A\x01'));
+
+      // No handshake reply in time means no raw-paste: nothing has been sent
+      // yet, so the caller can safely fall back to the plain raw REPL
+      let windowSize;
+      try {
+        const reply = await readByte();
+        if (reply !== 0x52) {
+          // Firmware without raw-paste read it as a raw REPL re-entry
+          await readText('w REPL; CTRL-B to exit\r\n>');
+          return { supported: false, found: false, buffer: '' };
+        }
+        if (await readByte() !== 0x01) {
+          return { supported: false, found: false, buffer: '' };
+        }
+        windowSize = (await readByte()) | ((await readByte()) << 8);
+      } catch (e) {
+        console.warn(`⚠️ [SerialAdapter] Raw-paste handshake failed: ${e.message}`);
+        return { supported: false, found: false, buffer: '' };
+      }
+
+      const bytes = typeof code === 'string' ? textEncoder.encode(code) : code;
+      let windowRemain = windowSize;
+      let offset = 0;
+
+      while (offset < bytes.length) {
+        // Take any flow-control bytes already received; block only when the window is used up
+        while (windowRemain === 0 || pos < chunk.length) {
+          const flow = await readByte();
+          if (flow === 0x01) {
+            windowRemain += windowSize;
+          } else if (flow === 0x04) {
+            // Device ended the paste early (e.g. error) - acknowledge and collect the reply
+            await writer.write(textEncoder.encode('\x04'));
+            return { supported: true, ...await readText('\x04>') };
+          } else {
+            throw new Error(`Unexpected raw-paste flow byte ${flow}`);
+          }
+        }
+
+        const end = Math.min(offset + windowRemain, bytes.length);
+        await writer.write(bytes.subarray(offset, end));
+        windowRemain -= end - offset;
+        offset = end;
+      }
+
+      // End of data; the device acks with \x04 (skipping late window refills)
+      await writer.write(textEncoder.encode('\x04'));
+      while (await readByte() !== 0x04) { /* window refill */ }
+
+      return { supported: true, ...await readText('\x04>') };
+
+    } finally {
+      await this.releaseWriter();
+      await this.releaseReader();
+    }
   },
 
   /**
    * Start a continuous read loop with callback
-   * Handles reader lifecycle internally
-   * @param {Function} onData - Callback function(data: string)
+   * Handles reader lifecycle internally; chunks are decoded and split into lines here
+   * @param {Function} onLines - Callback function(lines: string[]) with the complete
+   *   non-blank lines from each chunk
    * @param {Function} onError - Error callback
-   * @returns {Function} Stop function to cancel the loop
+   * @returns {Function} Stop function to cancel the loop; it returns a Promise
+   *   that resolves once the reader has been cancelled and released
    */
-  startReadLoop(onData, onError) {
+  startReadLoop(onLines, onError) {
     let running = true;
     let currentReader = null;
 
+    // The stream decoder holds back a multi-byte character split across two
+    // chunks, and the partial line waits here
+    const decoder = new TextDecoder();
+    let partial = '';
+
+    const splitLines = (value) => {
+      partial += decoder.decode(value, STREAM_DECODE);
+      const end = partial.lastIndexOf('\n');
+      if (end < 0) {
+        if (partial.length > MAX_LINE_LENGTH) {
+          console.warn(`⚠️ [SerialAdapter] Dropping ${partial.length} chars with no line end`);
+          partial = '';
+        }
+        return;
+      }
+      const lines = partial.slice(0, end).split('\n');
+      partial = partial.slice(end + 1);
+
+      // Strings cross into Python as one flat array; plain objects would be
+      // converted property by property, so parsing stays on the Python side
+      const complete = lines.filter((line) => line.trim());
+      if (complete.length) onLines(complete);
+    };
+
     const loop = async () => {
       try {
         // Get fresh reader for this loop
@@ -300,19 +654,36 @@ export const SerialAdapter = {
         }
 
         console.log('🔁 [SerialAdapter] Starting read loop');
-        currentReader = this.port.readable.getReader();
+
+        // Prefer a BYOB reader so every read fills the same buffer instead of
+        // allocating a new chunk; fall back to the default reader if unsupported
+        let buffer = null;
+        try {
+          currentReader = this.port.readable.getReader({ mode: 'byob' });
+          buffer = new ArrayBuffer(READ_BUFFER_SIZE);
+        } catch (e) {
+          currentReader = this.port.readable.getReader();
+        }
+
+        // Bound once; the reader does not change for the life of the loop
+        const read = currentReader.read.bind(currentReader);
 
         while (running) {
-          const { value, done } = await currentReader.read();
+          const { value, done } = buffer
+            ? await read(new Uint8Array(buffer))
+            : await read();
 
           if (done) {
             console.log('🛑 [SerialAdapter] Serial stream closed');
+            // Closing underneath a running loop means the port went away
+            if (running) throw new Error('Serial stream closed');
             break;
           }
 
           if (value) {
-            const text = new TextDecoder().decode(value);
-            onData(text);
+            splitLines(value);
+            // The read transferred the buffer; take it back for the next one
+            if (buffer) buffer = value.buffer;
           }
         }
 
@@ -336,8 +707,8 @@ export const SerialAdapter = {
       }
     };
 
-    // Start the loop
-    loop();
+    // Start the loop (settles after its reader cleanup has finished)
+    const finished = loop();
 
     // Return stop function
     return () => {
@@ -346,6 +717,7 @@ export const SerialAdapter = {
       if (currentReader) {
         currentReader.cancel().catch(() => {});
       }
+      return finished;
     };
   }
 };
@@ -31,6 +31,14 @@ import json
 import random
 import time
 import asyncio
+import traceback
+
+# Full Python tracebacks on errors (formatting the stack through PyScript is slow)
+DEBUG_TRACEBACKS = False
+
+def _js_object(**fields):
+    """Build a plain JS object in one conversion instead of one proxy set per field."""
+    return to_js(fields, dict_converter=Object.fromEntries)
 
 # Check if JavaScript adapters are loaded (hybrid architecture)
 if not hasattr(window, 'serialAdapter'):
@@ -69,15 +77,43 @@ hub_connection_mode = None  # "ble" or "serial"
 # Device data (will be updated via BLE from hub)
 devices = []
 
+# DOM-safe ID for each device name seen so far; device lists repeat on every
+# refresh, so each name is sanitized once instead of per device per message
+_sanitized_ids = {}
+
 # Message framing state for BLE transmission reassembly
 # Protocol: MSG:<length>|<payload>
 _frame_state = "waiting_header"  # States: "waiting_header", "receiving_payload"
 _expected_payload_length = 0
-_payload_buffer = ""
+_payload_parts = []  # Payload fragments, joined once the payload is complete
+_payload_length = 0  # Total length of _payload_parts
 _frame_buffer = ""  # Buffer for header parsing
 _last_fragment_time = 0
 _buffer_timeout = 2.0  # 2 second timeout for message completion
 
+# JS disconnect callbacks, looked up once when a connection is made
+_js_on_hub_disconnected = None
+_js_on_ble_disconnected = None
+
+# Connection error classification: DOMException name first, then lowercase
+# message substrings for errors that carry no name
+_BLE_ERROR_NAMES = {"AbortError": "cancelled", "NotAllowedError": "cancelled", "NotFoundError": "cancelled"}
+_SERIAL_ERROR_NAMES = {"AbortError": "cancelled", "NotFoundError": "cancelled",
+                       "InvalidStateError": "busy", "NetworkError": "busy"}
+_BLE_ERROR_TOKENS = (("cancelled", ("cancelled", "notallowederror", "aborterror")),)
+_SERIAL_ERROR_TOKENS = (("cancelled", ("cancelled", "aborted")), ("busy", ("in use", "busy")))
+
+def _classify_error(error, names, tokens):
+    """Return the error kind ("cancelled", "busy") or None if unrecognised."""
+    kind = names.get(getattr(error, "name", None) or "")
+    if kind:
+        return kind
+    low = str(error).lower()
+    for kind, kind_tokens in tokens:
+        if any(tok in low for tok in kind_tokens):
+            return kind
+    return None
+
 def parse_hub_response(data):
     """
     Parse and validate JSON response from ESP32 hub.
@@ -125,26 +161,33 @@ def process_complete_message(message_data):
     The hub sends two types of messages:
     1. JSON data (starts with '{') - commands, acks, device lists
     2. Plain text debug messages - hub's internal logging
+    
+    Transports that already decoded the JSON (the serial read loop) pass the
+    resulting dict, which is used as-is instead of being parsed a second time.
     """
     global devices
     
-    # Quick check: Is this JSON or a debug message?
-    message_data = message_data.strip()
-    
-    if not message_data.startswith('{'):
-        # Not JSON - this is a debug/print statement from the hub
-        console.info(f"📡 Hub: {message_data}")
-        return
-    
-    # It's JSON - try to parse it
-    console.log("=== PROCESSING HUB JSON ===")
-    console.log(f"Message: {message_data}")
-    
-    # Parse JSON using centralized function
-    parsed = parse_hub_response(message_data)
-    if not parsed:
-        console.error(f"❌ Failed to parse hub JSON: {message_data}")
-        return
+    if isinstance(message_data, dict):
+        parsed = message_data
+        console.log("=== PROCESSING HUB JSON ===")
+    else:
+        # Quick check: Is this JSON or a debug message?
+        message_data = message_data.strip()
+        
+        if not message_data.startswith('{'):
+            # Not JSON - this is a debug/print statement from the hub
+            console.info(f"📡 Hub: {message_data}")
+            return
+        
+        # It's JSON - try to parse it
+        console.log("=== PROCESSING HUB JSON ===")
+        console.log(f"Message: {message_data}")
+        
+        # Parse JSON using centralized function
+        parsed = parse_hub_response(message_data)
+        if not parsed:
+            console.error(f"❌ Failed to parse hub JSON: {message_data}")
+            return
     
     # Validate required fields
     if 'type' not in parsed:
@@ -165,22 +208,20 @@ def process_complete_message(message_data):
             console.log("Device list is not an array")
             return
         
-        # Deduplicate devices by MAC address (keep first occurrence)
+        # Deduplicate by MAC address (keep first occurrence) and convert to the
+        # expected format in a single pass - duplicates are skipped before any
+        # per-device work is done
         seen_macs = set()
-        unique_devices = []
+        devices = []
         for dev in device_list:
             mac = dev.get("mac", "")
-            if mac and mac not in seen_macs:
-                seen_macs.add(mac)
-                unique_devices.append(dev)
-            elif mac in seen_macs:
+            if not mac:
+                continue
+            if mac in seen_macs:
                 console.log(f"Skipping duplicate device with MAC: {mac}")
-        
-        console.log(f"Filtered {len(device_list)} devices to {len(unique_devices)} unique devices")
-        
-        # Convert to expected format
-        devices = []
-        for dev in unique_devices:
+                continue
+            seen_macs.add(mac)
+            
             # Calculate signal bars from RSSI
             rssi = dev.get("rssi", -100)
             if rssi >= -50:
@@ -207,12 +248,15 @@ def process_complete_message(message_data):
             device_name = dev.get("id", "Unknown")
             
             # Create sanitized ID for DOM selectors (remove spaces and special chars)
-            # Replace spaces with hyphens and remove any characters that aren't alphanumeric or hyphens
-            sanitized_id = device_name.replace(" ", "-").replace("_", "-")
-            # Remove any remaining special characters
-            sanitized_id = ''.join(c for c in sanitized_id if c.isalnum() or c == '-')
-            
-            console.log(f"DEBUG SANITIZATION: '{device_name}' -> '{sanitized_id}'")
+            sanitized_id = _sanitized_ids.get(device_name)
+            if sanitized_id is None:
+                # Replace spaces with hyphens and remove any characters that aren't alphanumeric or hyphens
+                sanitized_id = device_name.replace(" ", "-").replace("_", "-")
+                # Remove any remaining special characters
+                sanitized_id = ''.join(c for c in sanitized_id if c.isalnum() or c == '-')
+                _sanitized_ids[device_name] = sanitized_id
+                
+                console.log(f"DEBUG SANITIZATION: '{device_name}' -> '{sanitized_id}'")
             
             devices.append({
                 "id": sanitized_id,  # Sanitized ID for DOM selectors
@@ -223,6 +267,8 @@ def process_complete_message(message_data):
                 "battery": battery
             })
         
+        console.log(f"Filtered {len(device_list)} devices to {len(devices)} unique devices")
+        
         # Call JavaScript directly
         if hasattr(window, 'onDevicesUpdated'):
             console.log("Python: Calling onDevicesUpdated directly")
@@ -290,21 +336,28 @@ def on_ble_data(data):
     data : str
         Raw string fragment from BLE notification
     """
-    global _frame_state, _expected_payload_length, _payload_buffer, _frame_buffer, _last_fragment_time
+    global _frame_state, _expected_payload_length, _payload_parts, _payload_length, _frame_buffer, _last_fragment_time
+    
+    # Unframed JSON lines arrive already decoded by BluetoothConnection
+    if isinstance(data, dict):
+        process_complete_message(data)
+        return
     
-    console.log(f"=== BLE FRAGMENT v2.0 (FRAMED) ===")
-    console.log(f"State: {_frame_state}")
-    console.log(f"Fragment: {data[:50]}{'...' if len(data) > 50 else ''}")
-    console.log(f"Fragment length: {len(data)}")
+    # One console write per fragment (each console.log is a JS bridge call)
+    console.log(f"=== BLE FRAGMENT v2.0 (FRAMED) ===\n"
+                f"State: {_frame_state}\n"
+                f"Fragment: {data[:50]}{'...' if len(data) > 50 else ''}\n"
+                f"Fragment length: {len(data)}")
     
     # Timeout handling
     current_time = time.time()
-    if _frame_buffer or _payload_buffer:
+    if _frame_buffer or _payload_parts:
         if (current_time - _last_fragment_time) > _buffer_timeout:
             console.log(f"TIMEOUT: Resetting frame state (no data for {_buffer_timeout}s)")
             _frame_state = "waiting_header"
             _frame_buffer = ""
-            _payload_buffer = ""
+            _payload_parts = []
+            _payload_length = 0
             _expected_payload_length = 0
     
     _last_fragment_time = current_time
@@ -331,18 +384,20 @@ def on_ble_data(data):
                 
                 # Any data after the "|" is the start of the payload
                 payload_start = header_end + 1
-                _payload_buffer = _frame_buffer[payload_start:]
+                payload_head = _frame_buffer[payload_start:]
+                _payload_parts = [payload_head] if payload_head else []
+                _payload_length = len(payload_head)
                 _frame_buffer = ""
                 
                 # Transition to receiving payload state
                 _frame_state = "receiving_payload"
                 state_changed = True  # Mark that we just transitioned
-                console.log(f"State -> receiving_payload (already have {len(_payload_buffer)} bytes)")
+                console.log(f"State -> receiving_payload (already have {_payload_length} bytes)")
                 
                 # Check if header fragment contained complete payload
-                if len(_payload_buffer) >= _expected_payload_length:
+                if _payload_length >= _expected_payload_length:
                     # Complete message was in header fragment!
-                    complete_payload = _payload_buffer[:_expected_payload_length]
+                    complete_payload = payload_head[:_expected_payload_length]
                     console.log(f"PAYLOAD COMPLETE: {len(complete_payload)} bytes received (in header fragment)")
                     console.log(f"Processing complete framed message...")
                     
@@ -351,7 +406,8 @@ def on_ble_data(data):
                     
                     # Reset state for next message
                     _frame_state = "waiting_header"
-                    _payload_buffer = ""
+                    _payload_parts = []
+                    _payload_length = 0
                     _frame_buffer = ""
                     _expected_payload_length = 0
                     console.log("State -> waiting_header (ready for next message)")
@@ -369,15 +425,17 @@ def on_ble_data(data):
     # Only process payload if we're already in receiving_payload state 
     # (not if we just transitioned to it in this same call)
     if _frame_state == "receiving_payload" and not state_changed:
-        # Add new fragment to payload buffer
-        _payload_buffer += data
+        # Add new fragment to payload parts (joined once, when complete, so a long
+        # payload is not re-copied on every fragment)
+        _payload_parts.append(data)
+        _payload_length += len(data)
         
-        console.log(f"Payload progress: {len(_payload_buffer)}/{_expected_payload_length} bytes")
+        console.log(f"Payload progress: {_payload_length}/{_expected_payload_length} bytes")
         
         # Check if we have the complete payload
-        if len(_payload_buffer) >= _expected_payload_length:
+        if _payload_length >= _expected_payload_length:
             # Extract exact payload (trim any extra data)
-            complete_payload = _payload_buffer[:_expected_payload_length]
+            complete_payload = "".join(_payload_parts)[:_expected_payload_length]
             
             console.log(f"PAYLOAD COMPLETE: {len(complete_payload)} bytes received")
             console.log(f"Processing complete framed message...")
@@ -387,13 +445,14 @@ def on_ble_data(data):
             
             # Reset state for next message
             _frame_state = "waiting_header"
-            _payload_buffer = ""
+            _payload_parts = []
+            _payload_length = 0
             _frame_buffer = ""
             _expected_payload_length = 0
             
             console.log("State -> waiting_header (ready for next message)")
         else:
-            console.log(f"Waiting for more payload ({_expected_payload_length - len(_payload_buffer)} bytes remaining)")
+            console.log(f"Waiting for more payload ({_expected_payload_length - _payload_length} bytes remaining)")
 
 
 # Set the callback for BLE data
@@ -407,7 +466,7 @@ async def connect_hub():
     Returns:
         JavaScript object with status: "success"|"cancelled"|"error"
     """
-    global ble_connected, hub_device_name
+    global ble_connected, hub_device_name, _js_on_ble_disconnected
     
     try:
         # Connect by service UUID to find any Nordic UART device
@@ -416,31 +475,27 @@ async def connect_hub():
         if success:
             ble_connected = True
             hub_device_name = ble.device.name
+            _js_on_ble_disconnected = getattr(window, 'onBLEDisconnected', None)
             console.log(f"Connected to hub: {hub_device_name}")
             
             # Call JavaScript directly
             if hasattr(window, 'onBLEConnected'):
                 console.log("Python: Calling onBLEConnected directly")
                 # Create proper JavaScript object
-                js_data = Object.new()
-                js_data.deviceName = hub_device_name
+                js_data = _js_object(deviceName=hub_device_name)
                 window.onBLEConnected(js_data)
                 console.log("Python: BLE connected callback called")
             else:
                 console.log("Python: onBLEConnected not available")
             
             # Return proper JavaScript object
-            js_result = Object.new()
-            js_result.status = "success"
-            js_result.device = hub_device_name
+            js_result = _js_object(status="success", device=hub_device_name)
             return js_result
         else:
             # User cancelled or no device found - this is normal, not an error
             console.log("BLE connection cancelled or no device found")
             # Return proper JavaScript object
-            js_result = Object.new()
-            js_result.status = "cancelled"
-            js_result.error = "User cancelled or device not found"
+            js_result = _js_object(status="cancelled", error="User cancelled or device not found")
             return js_result
             
     except Exception as e:
@@ -448,45 +503,38 @@ async def connect_hub():
         console.log(f"Connection error: {error_msg}")
         
         # Check if it's a user cancellation error
-        if ("User cancelled" in error_msg or 
-            "NotAllowedError" in error_msg or 
-            "AbortError" in error_msg or
-            "cancelled" in error_msg.lower()):
+        if _classify_error(e, _BLE_ERROR_NAMES, _BLE_ERROR_TOKENS) == "cancelled":
             console.log("User cancelled BLE connection - this is normal")
-            js_result = Object.new()
-            js_result.status = "cancelled"
-            js_result.error = "User cancelled connection"
+            js_result = _js_object(status="cancelled", error="User cancelled connection")
             return js_result
         else:
             console.log(f"Real BLE error: {error_msg}")
-            js_result = Object.new()
-            js_result.status = "error"
-            js_result.error = error_msg
+            js_result = _js_object(status="error", error=error_msg)
             return js_result
 
 async def disconnect_hub():
     """Disconnect from BLE hub (legacy, use disconnect_hub_serial)."""
-    global ble_connected, hub_device_name, hub_connection_mode
+    global ble_connected, hub_device_name, hub_connection_mode, _js_on_ble_disconnected
     
     await ble.disconnect()
     ble_connected = False
     hub_device_name = None
     hub_connection_mode = None
     
-    # Call JavaScript directly
-    if hasattr(window, 'onBLEDisconnected'):
+    # Call JavaScript directly (resolved at connect time)
+    on_disconnected, _js_on_ble_disconnected = _js_on_ble_disconnected, None
+    if on_disconnected:
         console.log("Python: Calling onBLEDisconnected directly")
-        window.onBLEDisconnected()
+        on_disconnected()
     else:
         console.log("Python: onBLEDisconnected not available")
     
-    js_result = Object.new()
-    js_result.status = "disconnected"
+    js_result = _js_object(status="disconnected")
     return js_result
 
 async def connect_hub_serial():
     """Connect to hub via USB Serial (primary connection method)."""
-    global serial_connected, hub_device_name, hub_connection_mode
+    global serial_connected, hub_device_name, hub_connection_mode, _js_on_hub_disconnected
     
     console.log("Attempting Serial connection...")
     
@@ -494,34 +542,36 @@ async def connect_hub_serial():
         success = await serial.connect()
         
         if success:
+            repl.reset_device_state()
             serial_connected = True
             hub_device_name = "USB Serial Hub"
             hub_connection_mode = "serial"
+            _js_on_hub_disconnected = getattr(window, 'onHubDisconnected', None)
             
             # Set up data callback to reuse BLE data processing
-            serial.on_data_callback = on_serial_data
+            serial.on_batch_data_callback = on_serial_batch
             
             console.log("Serial connected successfully")
             
             # Notify JavaScript
             if hasattr(window, 'onHubConnected'):
-                js_data = Object.new()
-                js_data.deviceName = hub_device_name
-                js_data.mode = "serial"
+                js_data = _js_object(deviceName=hub_device_name, mode="serial")
                 window.onHubConnected(js_data)
             
             # Return success
-            js_result = Object.new()
-            js_result.status = "success"
-            js_result.device = hub_device_name
-            js_result.mode = "serial"
+            js_result = _js_object(
+                status="success",
+                device=hub_device_name,
+                mode="serial",
+            )
             return js_result
         else:
             # Connection failed - check console output for specific error
             console.log("Serial connection cancelled or failed - check console for details")
-            js_result = Object.new()
-            js_result.status = "error"
-            js_result.error = "Connection failed - check browser console for details"
+            js_result = _js_object(
+                status="error",
+                error="Connection failed - check browser console for details",
+            )
             return js_result
     
     except Exception as e:
@@ -529,43 +579,63 @@ async def connect_hub_serial():
         console.log(f"Serial connection exception: {error_msg}")
         
         # Check for specific error types
-        if "cancelled" in error_msg.lower() or "aborted" in error_msg.lower():
-            js_result = Object.new()
-            js_result.status = "cancelled"
+        kind = _classify_error(e, _SERIAL_ERROR_NAMES, _SERIAL_ERROR_TOKENS)
+        if kind == "cancelled":
+            js_result = _js_object(status="cancelled")
             return js_result
-        elif "in use" in error_msg.lower() or "busy" in error_msg.lower():
-            js_result = Object.new()
-            js_result.status = "error"
-            js_result.error = "Port in use - close Thonny/Arduino IDE and try again"
+        elif kind == "busy":
+            js_result = _js_object(
+                status="error",
+                error="Port in use - close Thonny/Arduino IDE and try again",
+            )
             return js_result
         else:
-            js_result = Object.new()
-            js_result.status = "error"
-            js_result.error = error_msg
+            js_result = _js_object(status="error", error=error_msg)
             return js_result
 
+def _clear_serial_state():
+    """Reset backend hub state after the serial link goes away (either way)."""
+    global serial_connected, hub_device_name, hub_connection_mode
+    serial_connected = False
+    hub_device_name = None
+    hub_connection_mode = None
+    repl.reset_device_state()
+
 async def disconnect_hub_serial():
     """Disconnect from Serial hub."""
-    global serial_connected, hub_device_name, hub_connection_mode
+    global _js_on_hub_disconnected
     
     console.log("Disconnecting Serial...")
     await serial.disconnect()
-    serial_connected = False
-    hub_device_name = None
-    hub_connection_mode = None
+    _clear_serial_state()
     
-    # Notify JavaScript
-    if hasattr(window, 'onHubDisconnected'):
-        window.onHubDisconnected()
+    # Notify JavaScript (callback resolved at connect time)
+    on_disconnected, _js_on_hub_disconnected = _js_on_hub_disconnected, None
+    if on_disconnected:
+        on_disconnected()
     
-    js_result = Object.new()
-    js_result.status = "disconnected"
+    js_result = _js_object(status="disconnected")
     return js_result
 
-def on_serial_data(data):
-    """Handle incoming Serial data (line-delimited JSON or debug output)."""
-    # Process the message (it will handle JSON vs debug message filtering)
-    process_complete_message(data)
+def on_serial_batch(messages):
+    """Handle a burst of messages from the Serial read loop (already decoded from JSON).
+    
+    Only the newest device list in a burst is processed: each one replaces
+    the whole list in the UI, so the older ones would be redrawn over at once.
+    """
+    last_devices = -1
+    for i, message in enumerate(messages):
+        if message.get("type") == "devices":
+            last_devices = i
+    
+    for i, message in enumerate(messages):
+        if i < last_devices and message.get("type") == "devices":
+            continue
+        # One failing message must not drop the rest of the burst
+        try:
+            process_complete_message(message)
+        except Exception as e:
+            console.error(f"Serial message handling error: {e}")
 
 def on_serial_connection_lost():
     """
@@ -574,18 +644,15 @@ def on_serial_connection_lost():
     This is called by hub_serial.py when the serial connection is lost
     unexpectedly (not from user-initiated disconnect).
     """
-    global serial_connected, hub_device_name, hub_connection_mode
-    
-    console.log("⚠️ Serial connection lost - updating backend state")
-    console.log(f"BEFORE: serial_connected={serial_connected}, mode={hub_connection_mode}")
+    before = f"BEFORE: serial_connected={serial_connected}, mode={hub_connection_mode}"
     
     # Update Python backend state immediately
-    serial_connected = False
-    hub_device_name = None
-    hub_connection_mode = None
+    _clear_serial_state()
     
-    console.log(f"AFTER: serial_connected={serial_connected}, mode={hub_connection_mode}")
-    console.log(f"serial.is_connected() = {serial.is_connected()}")
+    console.log("⚠️ Serial connection lost - updating backend state\n"
+                f"{before}\n"
+                f"AFTER: serial_connected={serial_connected}, mode={hub_connection_mode}\n"
+                f"serial.is_connected() = {serial.is_connected()}")
 
 async def send_command_to_hub(command, rssi_threshold="all"):
     """Send command to hub for ESP-NOW broadcast to modules.
@@ -601,21 +668,16 @@ async def send_command_to_hub(command, rssi_threshold="all"):
     if hub_connection_mode == "serial":
         if not serial.is_connected():
             console.log("❌ Serial not connected - cannot send command")
-            js_result = Object.new()
-            js_result.status = "error"
-            js_result.error = "Not connected to hub"
+            js_result = _js_object(status="error", error="Not connected to hub")
             return js_result
         
         # Format for Serial (JSON)
         cmd_obj = {"cmd": command, "rssi": rssi_threshold}
-        message = json.dumps(cmd_obj)
-        success = await serial.send_json(message)
+        success = await serial.send_json(cmd_obj)
         
     elif hub_connection_mode == "ble":
         if not ble.is_connected():
-            js_result = Object.new()
-            js_result.status = "error"
-            js_result.error = "Not connected to hub"
+            js_result = _js_object(status="error", error="Not connected to hub")
             return js_result
         
         # Format for BLE (legacy format)
@@ -623,21 +685,13 @@ async def send_command_to_hub(command, rssi_threshold="all"):
         success = await ble.send(message)
     
     else:
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = "Not connected to hub"
+        js_result = _js_object(status="error", error="Not connected to hub")
         return js_result
     
-    js_result = Object.new()
     if success:
         console.log(f"Sent to hub ({hub_connection_mode}): {command}")
-        js_result.status = "sent"
-        js_result.command = command
-        js_result.threshold = rssi_threshold
-    else:
-        js_result.status = "error"
-        js_result.error = "Send failed"
-    return js_result
+        return _js_object(status="sent", command=command, threshold=rssi_threshold)
+    return _js_object(status="error", error="Send failed")
 
 def get_connection_status():
     """Return hub connection status (connected bool, mode, device name)."""
@@ -655,9 +709,10 @@ def get_connection_status():
     console.log(f"Connection status: mode={hub_connection_mode}, connected={actual_connected_bool}")
     
     # Return proper JavaScript object
-    js_result = Object.new()
-    js_result.connected = actual_connected_bool
-    js_result.mode = hub_connection_mode if hub_connection_mode else ""
+    js_result = _js_object(
+        connected=actual_connected_bool,
+        mode=hub_connection_mode if hub_connection_mode else "",
+    )
     # Use empty string instead of None to avoid undefined in JavaScript
     js_result.device = hub_device_name if (actual_connected_bool and hub_device_name) else ""
     return js_result
@@ -684,8 +739,7 @@ async def refresh_devices_from_hub(rssi_threshold="all"):
         
         # Format for Serial (JSON)
         ping_obj = {"cmd": "PING", "rssi": threshold_str}
-        ping_command = json.dumps(ping_obj)
-        await serial.send_json(ping_command)
+        await serial.send_json(ping_obj)
         
     elif hub_connection_mode == "ble":
         if not ble.is_connected():
@@ -701,7 +755,7 @@ async def refresh_devices_from_hub(rssi_threshold="all"):
         return to_js([])
     
     # Wait for response (hub should send back device list)
-    # The response will be handled by on_ble_data or on_serial_data callback
+    # The response will be handled by on_ble_data or on_serial_batch callback
     # which will update the global devices list
     
     console.log(f"Device scan requested from hub ({hub_connection_mode}) with RSSI threshold: {threshold_str}")
@@ -738,9 +792,7 @@ def send_command(command, device_ids):
         return send_command_to_hub(command, rssi_threshold)
     else:
         # Return error if not connected
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = "Not connected to hub"
+        js_result = _js_object(status="error", error="Not connected to hub")
         return js_result
 
 
@@ -764,9 +816,7 @@ async def upload_firmware(files_json):
     
     # Check if serial is connected
     if not serial.is_connected():
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = "Not connected to serial port"
+        js_result = _js_object(status="error", error="Not connected to serial port")
         return js_result
     
     try:
@@ -797,11 +847,12 @@ async def upload_firmware(files_json):
             
             # Notify JavaScript of progress
             if hasattr(window, 'onUploadProgress'):
-                progress = Object.new()
-                progress.current = idx + 1
-                progress.total = total_files
-                progress.file = file_path
-                progress.status = "uploading"
+                progress = _js_object(
+                    current=idx + 1,
+                    total=total_files,
+                    file=file_path,
+                    status="uploading",
+                )
                 window.onUploadProgress(progress)
             
             console.log(f"Uploading {idx + 1}/{total_files}: {file_path}...")
@@ -818,11 +869,12 @@ async def upload_firmware(files_json):
             
             # Notify upload complete for this file
             if hasattr(window, 'onUploadProgress'):
-                progress = Object.new()
-                progress.current = idx + 1
-                progress.total = total_files
-                progress.file = file_path
-                progress.status = "uploaded"
+                progress = _js_object(
+                    current=idx + 1,
+                    total=total_files,
+                    file=file_path,
+                    status="uploaded",
+                )
                 window.onUploadProgress(progress)
         
         # Exit raw REPL mode back to normal REPL
@@ -831,21 +883,19 @@ async def upload_firmware(files_json):
         
         # Start the uploaded main.py
         console.log("Starting hub firmware...")
-        await repl.execute_command("import main", timeout_ms=2000)
+        await firmware.start_main()
         
         console.log(f"✅ Upload complete: {total_files} files")
         console.log("Hub firmware is now running...")
         
         # Return success
-        js_result = Object.new()
-        js_result.status = "success"
-        js_result.files_uploaded = total_files
+        js_result = _js_object(status="success", files_uploaded=total_files)
         return js_result
         
     except Exception as e:
-        console.error(f"Upload failed: {e}")
-        import traceback
-        traceback.print_exc()
+        console.error(f"Upload failed: {type(e).__name__}: {e}")
+        if DEBUG_TRACEBACKS:
+            traceback.print_exc()
         
         # Try to exit REPL mode on error
         try:
@@ -853,17 +903,13 @@ async def upload_firmware(files_json):
         except:
             pass
         
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = str(e)
+        js_result = _js_object(status="error", error=str(e))
         return js_result
 
 async def get_board_info():
     """Get MicroPython board info (enters REPL, queries, returns to JSON mode)."""
     if not serial.is_connected():
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = "Not connected"
+        js_result = _js_object(status="error", error="Not connected")
         return js_result
     
     try:
@@ -879,9 +925,7 @@ async def get_board_info():
         # Restart JSON read loop to return to normal operation
         serial._start_json_read_loop()
         
-        js_result = Object.new()
-        js_result.status = "success"
-        js_result.info = info
+        js_result = _js_object(status="success", info=info)
         return js_result
         
     except Exception as e:
@@ -894,9 +938,7 @@ async def get_board_info():
         except:
             pass
         
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = str(e)
+        js_result = _js_object(status="error", error=str(e))
         return js_result
 
 async def query_device_info_for_setup():
@@ -905,9 +947,7 @@ async def query_device_info_for_setup():
     
     if not serial.is_connected():
         console.log("❌ [query_device_info_for_setup] Serial not connected")
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = "Not connected to serial port"
+        js_result = _js_object(status="error", error="Not connected to serial port")
         return js_result
     
     console.log("✅ [query_device_info_for_setup] Serial is connected")
@@ -922,16 +962,15 @@ async def query_device_info_for_setup():
             console.log(f"⚠️ [query_device_info_for_setup] No JSON read loop to stop: {e}")
             pass
         
-        js_result = Object.new()
-        js_result.status = "loop_stopped"
-        js_result.message = "JSON read loop stopped, ready for board info query"
+        js_result = _js_object(
+            status="loop_stopped",
+            message="JSON read loop stopped, ready for board info query",
+        )
         return js_result
         
     except Exception as e:
         console.error(f"❌ [query_device_info_for_setup] Failed: {e}")
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = str(e)
+        js_result = _js_object(status="error", error=str(e))
         return js_result
 
 def get_device_board_info():
@@ -940,9 +979,7 @@ def get_device_board_info():
     
     if not serial.is_connected():
         console.log("❌ [get_device_board_info] Serial not connected")
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = "Not connected to serial port"
+        js_result = _js_object(status="error", error="Not connected to serial port")
         return js_result
     
     # Return a promise-like object that JavaScript can await
@@ -952,15 +989,11 @@ def get_device_board_info():
             info = await repl.get_board_info()
             console.log(f"✅ [get_device_board_info] Got board info: {info}")
             
-            js_result = Object.new()
-            js_result.status = "success"
-            js_result.info = info
+            js_result = _js_object(status="success", info=info)
             return js_result
         except Exception as e:
             console.error(f"❌ [get_device_board_info] Failed: {e}")
-            js_result = Object.new()
-            js_result.status = "error"
-            js_result.error = str(e)
+            js_result = _js_object(status="error", error=str(e))
             return js_result
     
     # Return the coroutine for JavaScript to await
@@ -969,9 +1002,7 @@ def get_device_board_info():
 async def execute_file_on_device(file_path):
     """Execute Python file on device (enters REPL, runs file, returns to JSON mode)."""
     if not serial.is_connected():
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = "Not connected"
+        js_result = _js_object(status="error", error="Not connected")
         return js_result
     
     try:
@@ -990,9 +1021,7 @@ async def execute_file_on_device(file_path):
         # Restart JSON read loop to return to normal operation
         serial._start_json_read_loop()
         
-        js_result = Object.new()
-        js_result.status = "success"
-        js_result.output = output
+        js_result = _js_object(status="success", output=output)
         return js_result
         
     except Exception as e:
@@ -1005,17 +1034,13 @@ async def execute_file_on_device(file_path):
         except:
             pass
         
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = str(e)
+        js_result = _js_object(status="error", error=str(e))
         return js_result
 
 async def soft_reset_device():
     """Soft reset device (MicroPython re-init, no hardware reboot)."""
     if not serial.is_connected():
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = "Not connected"
+        js_result = _js_object(status="error", error="Not connected")
         return js_result
     
     try:
@@ -1028,24 +1053,18 @@ async def soft_reset_device():
         # Device is now at normal REPL prompt (>>>)
         # Don't restart JSON mode - user may want to interact with REPL
         
-        js_result = Object.new()
-        js_result.status = "success"
-        js_result.message = "Device soft reset (at REPL prompt)"
+        js_result = _js_object(status="success", message="Device soft reset (at REPL prompt)")
         return js_result
         
     except Exception as e:
         console.error(f"Soft reset failed: {e}")
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = str(e)
+        js_result = _js_object(status="error", error=str(e))
         return js_result
 
 async def hard_reset_device():
     """Hard reset device (full hardware reboot, runs main.py on restart)."""
     if not serial.is_connected():
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = "Not connected"
+        js_result = _js_object(status="error", error="Not connected")
         return js_result
     
     try:
@@ -1062,9 +1081,7 @@ async def hard_reset_device():
         # Restart JSON read loop to reconnect
         serial._start_json_read_loop()
         
-        js_result = Object.new()
-        js_result.status = "success"
-        js_result.message = "Device rebooted (running main.py)"
+        js_result = _js_object(status="success", message="Device rebooted (running main.py)")
         return js_result
         
     except Exception as e:
@@ -1076,9 +1093,7 @@ async def hard_reset_device():
         except:
             pass
         
-        js_result = Object.new()
-        js_result.status = "error"
-        js_result.error = str(e)
+        js_result = _js_object(status="error", error=str(e))
         return js_result
 
 # ============================================================================
@@ -13,6 +13,46 @@ Upload Process:
 """
 
 import asyncio
+import binascii
+
+
+# Raw file bytes per write call on the device (4 KB of base64 per piece)
+UPLOAD_PIECE_SIZE = 3 * 1024
+
+# Device-side code skeletons, filled in with % instead of rebuilt as f-strings.
+# Paths go in with %r, so a quote in a file name can't break the code
+MKDIR_TEMPLATE = """
+import os
+try:
+    os.mkdir(%r)
+except OSError:
+    pass  # Already exists
+"""
+# Upload steps, each its own REPL call so the device only ever holds one
+# piece of the file (older firmware only has the "u"-prefixed ubinascii module)
+UPLOAD_OPEN_TEMPLATE = """try:
+    from binascii import a2b_base64
+except ImportError:
+    from ubinascii import a2b_base64
+_upload_f = open(%r, 'wb')
+"""
+# (pieces are built as bytes, so base64 output is never decoded to str)
+UPLOAD_PIECE_TEMPLATE = b"_upload_f.write(a2b_base64(b'%s'))\n"
+UPLOAD_CLOSE = "_upload_f.close()\nprint('OK')\n"
+# Best-effort cleanup after a failed step (the file may not have been opened)
+UPLOAD_ABORT = """try:
+    _upload_f.close()
+except Exception:
+    pass
+"""
+EXEC_TEMPLATE = "exec(open(%r).read())"
+# Typed at the normal REPL prompt; the carriage return runs it
+START_MAIN_CODE = "import main\r"
+# Ctrl-D included, so the reset goes out in a single write
+HARD_RESET_CODE = "import machine\nmachine.reset()\n\x04"
+
+# Prompt printed once a soft reset has finished (and main.py, if any, has returned)
+SOFT_RESET_PROMPT = ('>>> ',)
 
 
 class FirmwareManager:
@@ -40,18 +80,15 @@ class FirmwareManager:
         
         print(f"Creating directory: {dir_path}")
         
-        code = f"""
-import os
-try:
-    os.mkdir('{dir_path}')
-except OSError:
-    pass  # Already exists
-"""
+        code = MKDIR_TEMPLATE % dir_path
         await self.repl.execute_command(code, timeout_ms=3000)
     
     async def upload_single_file(self, file_path, content):
         """
-        Upload single file to device using triple-quoted string.
+        Upload single file to device as base64 decoded on the device.
+        
+        Base64 needs no escaping, and the device only has to compile one short
+        a2b_base64 call per piece instead of the whole file as a string literal.
         
         Args:
             file_path: Path on device (e.g., "main.py", "lib/module.py")
@@ -59,31 +96,26 @@ except OSError:
         """
         print(f"Uploading {file_path} ({len(content)} bytes)")
         
-        # Escape content for triple-quoted Python string
-        content_escaped = content.replace('\\', '\\\\').replace("'''", "\\'\\'\\'")
-        
-        # Build Python code to write the file
-        upload_code = f"""
-with open('{file_path}', 'w') as f:
-    f.write('''{content_escaped}''')
-print('OK')
-"""
-        
+        # One call opens the file, one per piece writes it, one closes it, so
+        # the device compiles ~4 KB of base64 at a time instead of the whole
+        # file (pieces are memoryview slices, never copies of the encoded file)
+        data = memoryview(content.encode('utf-8'))
         try:
-            # Use chunked upload for large files (> 2KB) to support older MicroPython
-            # Helps ESP32-C3 with limited RAM and older firmware versions
-            # Doesn't hurt newer devices (C6) - just slightly slower
-            timeout_ms = max(5000, len(content) // 100)  # ~10KB/sec minimum
-            chunk_size = 256 if len(upload_code) > 2048 else None
+            await self.repl.execute_raw_paste(UPLOAD_OPEN_TEMPLATE % file_path, timeout_ms=3000)
             
-            if chunk_size:
-                print(f"Using chunked upload ({chunk_size} bytes/chunk) for compatibility")
+            for i in range(0, len(data), UPLOAD_PIECE_SIZE):
+                b64 = binascii.b2a_base64(data[i:i + UPLOAD_PIECE_SIZE], newline=False)
+                piece_code = UPLOAD_PIECE_TEMPLATE % b64
+                # Raw-paste mode streams the code under the device's flow control.
+                # Without it, send in 256-byte chunks to support older MicroPython
+                # (ESP32-C3 with limited RAM, older firmware)
+                await self.repl.execute_raw_paste(
+                    piece_code,
+                    timeout_ms=5000,
+                    chunk_size=256 if len(piece_code) > 2048 else None
+                )
             
-            response = await self.repl.execute_command(
-                upload_code, 
-                timeout_ms=timeout_ms,
-                chunk_size=chunk_size
-            )
+            response = await self.repl.execute_raw_paste(UPLOAD_CLOSE, timeout_ms=3000)
             
             # Check for OK response
             if 'OK' in response or not response:
@@ -92,6 +124,10 @@ print('OK')
                 print(f"⚠️ Upload completed but unexpected response: {response[:100]}")
             
         except Exception as e:
+            try:
+                await self.repl.execute_raw_paste(UPLOAD_ABORT, timeout_ms=2000)
+            except Exception:
+                pass
             raise Exception(f"Upload failed for {file_path}: {str(e)}")
     
     async def execute_file(self, file_path, timeout_ms=10000):
@@ -107,12 +143,22 @@ print('OK')
         """
         print(f"Executing {file_path}...")
         
-        code = f"exec(open('{file_path}').read())"
+        code = EXEC_TEMPLATE % file_path
         response = await self.repl.execute_command(code, timeout_ms=timeout_ms)
         
         print(f"✓ Executed {file_path}")
         return response
     
+    async def start_main(self):
+        """
+        Start the uploaded main.py from the normal REPL (>>> prompt).
+        
+        Fire-and-forget: the hub firmware loops forever, so no prompt or
+        raw REPL end marker ever comes back to wait for.
+        """
+        print("Starting main.py...")
+        await self.repl.serial.send_raw(START_MAIN_CODE)
+    
     async def soft_reset(self, wait_time_ms=1500):
         """
         Soft reset device (Ctrl-D).
@@ -121,12 +167,16 @@ print('OK')
         Device will be at REPL prompt after reset.
         
         Args:
-            wait_time_ms: Time to wait for reset to complete
+            wait_time_ms: Longest time to wait for reset to complete
         """
         print("Soft resetting device...")
         await self.repl.serial.send_raw('\x04')
-        await asyncio.sleep(wait_time_ms / 1000.0)
-        print(f"✓ Soft reset complete (waited {wait_time_ms}ms)")
+        # Returns at the prompt; the full wait only applies when main.py keeps running
+        found, _ = await self.repl.serial.read_until(SOFT_RESET_PROMPT, wait_time_ms)
+        if found:
+            print("✓ Soft reset complete (at >>> prompt)")
+        else:
+            print(f"✓ Soft reset complete (waited {wait_time_ms}ms)")
     
     async def hard_reset(self, wait_time_ms=2000):
         """
@@ -139,14 +189,9 @@ print('OK')
         """
         print("Hard resetting device (hardware reboot)...")
         
-        # Execute reset command in raw REPL
-        reset_code = """
-import machine
-machine.reset()
-"""
+        # Execute reset command in raw REPL (code and CTRL-D in one write)
         try:
-            await self.repl.serial.send_raw(reset_code)
-            await self.repl.serial.send_raw('\x04')  # CTRL-D to execute
+            await self.repl.serial.send_raw(HARD_RESET_CODE)
             
             # Wait for device to reset
             await asyncio.sleep(wait_time_ms / 1000.0)
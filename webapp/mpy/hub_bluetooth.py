@@ -25,15 +25,25 @@ Architecture:
 """
 
 from pyscript import window
+from pyodide.ffi import to_js
 import json
 
 
+# json.dumps without the default spaces after ',' and ':' (the encoder is
+# built once, instead of per call as json.dumps does for non-default options)
+_dumps = json.JSONEncoder(separators=(',', ':')).encode
+
+
 class BluetoothConnection:
     """Manages BLE connection and message protocol"""
     
     def __init__(self):
         """Initialize Bluetooth connection manager"""
         self.on_data_callback = None
+        self._rx = ''   # partial newline-delimited JSON line carried between notifications
+        self._frame_left = 0      # payload chars still due for the current MSG:<length>| frame
+        self._frame_header = ''   # start of a MSG: header split across notifications
+        self.debug = False   # per-message prints are costly console writes in PyScript
         print("📱 BluetoothConnection initialized")
         
         # Check if JS adapter is available
@@ -61,33 +71,12 @@ class BluetoothConnection:
             success = await self.adapter.connect(name_prefix)
             
             if success:
-                # Set up notification handler
-                def on_notification(data):
-                    """Handle incoming notifications"""
-                    if not data:
-                        return
-                    
-                    print(f"Received: {data}")
-                    
-                    # Parse JSON messages
-                    try:
-                        # Data may contain multiple newline-separated messages
-                        lines = data.split('\n')
-                        for line in lines:
-                            line = line.strip()
-                            if not line:
-                                continue
-                            
-                            message = json.loads(line)
-                            if self.on_data_callback:
-                                self.on_data_callback(message)
-                    except json.JSONDecodeError:
-                        # Not valid JSON, pass raw data to callback
-                        if self.on_data_callback:
-                            self.on_data_callback(data)
+                self._rx = ''
+                self._frame_left = 0
+                self._frame_header = ''
                 
                 # Start notifications with our handler
-                await self.adapter.startNotifications(on_notification)
+                await self.adapter.startNotifications(self._on_notification)
                 
                 # Set up disconnection handler
                 def on_disconnect():
@@ -103,6 +92,85 @@ class BluetoothConnection:
             print(f"Bluetooth connection error: {e}")
             return False
     
+    def _on_notification(self, data):
+        """Handle incoming notifications"""
+        if not data:
+            return
+        
+        if self.debug:
+            print(f"Received: {data}")
+        
+        if not self.on_data_callback:
+            return
+        
+        # MSG:<length>| framing (header and payload fragments) goes straight to
+        # the data callback, which reassembles it
+        if self._frame_left or self._frame_header or (not self._rx and data.startswith('MSG:')):
+            self._track_frame(data)
+            self.on_data_callback(data)
+            return
+        
+        # Other text with no newline and nothing pending is passed on as is,
+        # unless it starts a JSON line, which waits for the rest of the line
+        if not self._rx and '\n' not in data and data.lstrip()[:1] not in ('{', '['):
+            self.on_data_callback(data)
+            return
+        
+        # Only split off complete lines; the tail waits for the next notification
+        self._rx += data
+        idx = self._rx.rfind('\n')
+        if idx < 0:
+            return
+        block = self._rx[:idx]
+        tail = self._rx[idx + 1:]
+        
+        # Hold the tail back only if it starts a JSON line
+        self._rx = tail if tail.lstrip()[:1] in ('{', '[') else ''
+        
+        for line in block.split('\n'):
+            self._dispatch_line(line)
+        if tail and not self._rx:
+            self._dispatch_line(tail)
+    
+    def _track_frame(self, data):
+        """Follow a MSG:<length>| frame so its payload fragments are recognised"""
+        if self._frame_left:
+            self._frame_left = max(0, self._frame_left - len(data))
+            return
+        
+        header = self._frame_header + data
+        bar = header.find('|')
+        if bar < 0:
+            # Header split across notifications; a long one is not a header
+            self._frame_header = header if len(header) < 16 else ''
+            return
+        self._frame_header = ''
+        try:
+            length = int(header[4:bar])
+        except ValueError:
+            return
+        self._frame_left = max(0, length - (len(header) - bar - 1))
+    
+    def _dispatch_line(self, line):
+        """Pass one received line to the data callback, decoded if it is JSON"""
+        stripped = line.strip()
+        if not stripped:
+            return
+        
+        # Cheap structural gate: only lines that open and close like JSON
+        # reach json.loads, so plain text never pays for a failed parse
+        first = stripped[0]
+        last = stripped[-1]
+        if (first == '{' and last == '}') or (first == '[' and last == ']'):
+            try:
+                self.on_data_callback(json.loads(stripped))
+                return
+            except ValueError:
+                pass
+        
+        # Not valid JSON, pass raw data to callback
+        self.on_data_callback(line)
+    
     async def connect_by_service(self):
         """
         Connect to BLE device by service UUID.
@@ -122,7 +190,7 @@ class BluetoothConnection:
         Send message to device.
         
         Args:
-            message: JSON string or dict to send
+            message: JSON string, dict, or already-encoded bytes to send
             
         Returns:
             bool: True if sent successfully
@@ -132,17 +200,26 @@ class BluetoothConnection:
             return False
         
         try:
-            # Convert dict to JSON string if needed
-            if isinstance(message, dict):
-                message = json.dumps(message)
+            # Already-encoded bytes go straight to the adapter as a Uint8Array
+            if isinstance(message, (bytes, bytearray)):
+                if not message.endswith(b'\n'):
+                    message = message + b'\n'
+                await self.adapter.write(to_js(message))
+                if self.debug:
+                    print(f"Sent: {len(message)} bytes")
+                return True
             
-            # Add newline terminator if not present
-            if not message.endswith('\n'):
+            # Convert dict to JSON string (newline appended in the same step)
+            if isinstance(message, dict):
+                message = _dumps(message) + '\n'
+            elif not message.endswith('\n'):
+                # Add newline terminator if not present
                 message += '\n'
             
             # Send via JS adapter
             await self.adapter.write(message)
-            print(f"Sent: {message.strip()}")
+            if self.debug:
+                print(f"Sent: {message.strip()}")
             return True
             
         except Exception as e:
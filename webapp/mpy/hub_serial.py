@@ -16,18 +16,60 @@ Architecture:
 """
 
 from pyscript import window
+from pyodide.ffi import create_proxy, to_js
 import asyncio
 import json
 
 
+# Parsed messages waiting for the dispatcher; the oldest is dropped when full
+MESSAGE_QUEUE_SIZE = 256
+
+# Hub messages are JSON objects; a line with any other (non-space) first
+# character is REPL or print() chatter and skips json.loads and its exception path
+JSON_START = '{'
+
+# Control characters spelled out in debug logs (one str.translate pass)
+CTRL_NAMES = str.maketrans({
+    '\x01': '<CTRL-A>',
+    '\x02': '<CTRL-B>',
+    '\x03': '<CTRL-C>',
+    '\x04': '<CTRL-D>',
+})
+
+
+def _wire(data):
+    """Bytes go to the adapter as a Uint8Array, skipping the JS string conversion"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return to_js(data)
+    return data
+
+
+def _printable(data):
+    """Debug form of outgoing raw data with control characters spelled out"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return f"{len(data)} bytes (binary)"
+    return repr(data.translate(CTRL_NAMES))
+
+
+# json.dumps without the default spaces after ',' and ':' (the encoder is
+# built once, instead of per call as json.dumps does for non-default options)
+_dumps = json.JSONEncoder(separators=(',', ':')).encode
+
+
 class SerialConnection:
     """Manages Serial connection and JSON message protocol"""
     
     def __init__(self):
         """Initialize Serial connection manager"""
         self.on_data_callback = None
+        self.on_batch_data_callback = None   # optional: gets each burst of messages as one list
         self.on_connection_lost_callback = None
         self.read_loop_stop = None
+        self._connected = False   # kept in step with connect/disconnect/read-loop loss
+        self._tx_parts = []               # outgoing lines waiting for the next write
+        self._tx_flush = None             # task that writes them, shared by their senders
+        self._dispatch_task = None        # task delivering parsed messages to the callbacks
+        self.debug = False                # log every raw send/receive (costly during uploads)
         print("🔌 SerialConnection initialized")
         
         # Check if JS adapter is available
@@ -35,10 +77,24 @@ class SerialConnection:
             raise Exception("serialAdapter not found! Make sure js/adapters/serialAdapter.js is loaded.")
         
         self.adapter = window.serialAdapter
+        
+        # Hot adapter methods looked up once instead of through the JsProxy per call
+        self._write = self.adapter.write
+        self._read = self.adapter.read
+        self._read_until_deadline = self.adapter.readUntilDeadline
+        self._write_and_drain = self.adapter.writeAndDrain
+        self._raw_paste = self.adapter.rawPaste
+        self._write_and_read_until = self.adapter.writeAndReadUntil
+        
+        # Read loop handlers, proxied once and reused by every read loop
+        # (a fresh closure per loop would leave a new proxy behind per reconnect)
+        self._rx_queue = None
+        self._lines_proxy = create_proxy(self._on_serial_lines)
+        self._error_proxy = create_proxy(self._on_serial_error)
     
     def is_connected(self):
-        """Check if serial port is connected"""
-        return self.adapter.isConnected()
+        """Check if serial port is connected (no call into the JS adapter)"""
+        return self._connected
     
     async def connect(self):
         """
@@ -48,10 +104,15 @@ class SerialConnection:
             bool: True if connected successfully, False otherwise
         """
         try:
-            # Use JS adapter for connection
-            success = await self.adapter.connect()
+            # Reopen the port from a connection that was lost or left open by a
+            # page reload (not closed with disconnect()); otherwise ask the user
+            success = await self.adapter.tryReattach()
+            if not success:
+                success = await self.adapter.connect()
             
             if success:
+                self._connected = True
+                
                 # Start read loop for JSON messages
                 self._start_json_read_loop()
                 print("Serial connected successfully")
@@ -64,6 +125,7 @@ class SerialConnection:
     
     async def disconnect(self):
         """Disconnect from serial port and stop read loop"""
+        self._connected = False
         try:
             # Stop read loop
             await self._stop_json_read_loop()
@@ -91,31 +153,80 @@ class SerialConnection:
         try:
             # Convert dict to JSON string if needed
             if isinstance(message, dict):
-                message = json.dumps(message)
+                message = _dumps(message)
             
-            # Add newline terminator
+            # Queue the line; sends made in the same event-loop turn share a write.
+            # The newline terminator is queued as its own part, so no
+            # intermediate message + '\n' string is built before the join
+            parts = self._tx_parts
+            parts.append(message)
             if not message.endswith('\n'):
-                message += '\n'
+                parts.append('\n')
             
-            # Send via JS adapter
-            await self.adapter.write(message)
+            if self._tx_flush is None:
+                self._tx_flush = asyncio.ensure_future(self._flush_tx())
+                self._tx_flush.add_done_callback(self._tx_flush_done)
+            # Shielded: the flush is shared by every coalesced sender, so
+            # cancelling one of them must not cancel (and lose) the others' data
+            try:
+                await asyncio.shield(self._tx_flush)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Already reported once by _tx_flush_done for all senders
+                return False
             return True
             
         except Exception as e:
             print(f"Serial send error: {e}")
             return False
     
+    async def _flush_tx(self):
+        """Write all queued lines with as few adapter writes as possible"""
+        try:
+            # Yield once so other sends scheduled this turn can join the batch
+            await asyncio.sleep(0)
+            while self._tx_parts:
+                data = ''.join(self._tx_parts)
+                self._tx_parts = []
+                await self._write(data)
+        except Exception:
+            self._tx_parts = []
+            raise
+        finally:
+            self._tx_flush = None
+    
+    def _tx_flush_done(self, task):
+        """Report a failed flush, even when every sender waiting on it was cancelled"""
+        if self._tx_flush is task:
+            self._tx_flush = None
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            print(f"Serial send error: {error}")
+    
     async def send_raw(self, data):
         """
         Send raw bytes without adding newline (for REPL commands).
         
         Args:
-            data: Raw string to send (may contain control characters)
+            data: Raw string or bytes to send (may contain control characters)
+        """
+        if self.debug:
+            print(f"📤 Sending: {_printable(data)}")
+        await self._write(_wire(data))
+    
+    async def send_raw_drained(self, data):
+        """
+        Send raw data and wait for the port's write backpressure to clear.
+        
+        Args:
+            data: Raw string or bytes to send (may contain control characters)
         """
-        # Debug logging
-        printable = data.replace('\x03', '<CTRL-C>').replace('\x04', '<CTRL-D>').replace('\x01', '<CTRL-A>').replace('\x02', '<CTRL-B>')
-        print(f"📤 Sending: {repr(printable)}")
-        await self.adapter.write(data)
+        if self.debug:
+            print(f"📤 Sending: {_printable(data)}")
+        await self._write_and_drain(_wire(data))
     
     async def read_raw(self, timeout_ms=2000):
         """
@@ -127,58 +238,140 @@ class SerialConnection:
         Returns:
             str: Received data or empty string
         """
-        result = await self.adapter.read(timeout_ms)
-        if result:
-            # Debug logging
-            printable = result.replace('\x03', '<CTRL-C>').replace('\x04', '<CTRL-D>').replace('\x01', '<CTRL-A>').replace('\x02', '<CTRL-B>')
-            print(f"📥 Received ({len(result)} bytes): {repr(printable[:200])}")
+        result = await self._read(timeout_ms)
+        if result and self.debug:
+            print(f"📥 Received ({len(result)} bytes): {repr(result[:200].translate(CTRL_NAMES))}")
         return result
     
+    async def read_until(self, markers, timeout_ms=2000):
+        """
+        Read until any marker appears or timeout_ms passes, in one adapter call.
+        
+        Args:
+            markers: Strings that end the read early
+            timeout_ms: Total time to wait in milliseconds
+            
+        Returns:
+            tuple: (found, data) - whether a marker was seen, and everything read
+        """
+        result = await self._read_until_deadline(timeout_ms, to_js(list(markers)))
+        return result.found, result.buffer
+    
+    async def send_and_read_until(self, data, markers, timeout_ms=2000):
+        """
+        Send raw data, then read until any marker appears, in one adapter call.
+        
+        Args:
+            data: Raw string or bytes to send (may contain control characters)
+            markers: Strings that end the read early
+            timeout_ms: Time to wait for a marker in milliseconds
+            
+        Returns:
+            tuple: (found, data) - whether a marker was seen, and everything read
+        """
+        if self.debug:
+            print(f"📤 Sending: {_printable(data)}")
+        result = await self._write_and_read_until(_wire(data), timeout_ms, to_js(list(markers)))
+        return result.found, result.buffer
+    
+    async def raw_paste(self, code, timeout_ms=5000):
+        """
+        Execute code through the device's raw-paste mode (from the raw REPL prompt).
+        
+        Args:
+            code: Python code to execute (str, or UTF-8 bytes)
+            timeout_ms: Total time to wait in milliseconds
+            
+        Returns:
+            tuple: (supported, found, data) - whether the device accepted raw-paste
+            (False also when the handshake timed out, before any code was sent),
+            whether the reply ended with "\\x04>", and the reply itself
+        """
+        result = await self._raw_paste(_wire(code), timeout_ms)
+        return result.supported, result.found, result.buffer
+    
     def _start_json_read_loop(self):
         """Start background read loop for JSON messages using JS adapter"""
         if self.read_loop_stop:
             # Stop existing loop
             self.read_loop_stop()
         
-        # Start read loop with JS adapter
-        def on_data(data):
-            """Handle incoming data from JS adapter"""
-            if not data:
-                return
-                
-            # Parse line-delimited JSON messages
-            lines = data.split('\n')
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                try:
-                    message = json.loads(line)
-                    if self.on_data_callback:
-                        self.on_data_callback(message)
-                except json.JSONDecodeError:
-                    # Not valid JSON, ignore
-                    pass
+        # Parsed messages reach the callbacks through a bounded queue and a
+        # dispatcher task, so a slow callback never holds up the JS read loop
+        if self._dispatch_task:
+            self._dispatch_task.cancel()
+        self._rx_queue = asyncio.Queue(maxsize=MESSAGE_QUEUE_SIZE)
+        self._dispatch_task = asyncio.ensure_future(self._dispatch_messages(self._rx_queue))
         
-        def on_error(error):
-            """Handle read errors"""
-            print(f"Serial read error: {error}")
-            if self.on_connection_lost_callback:
-                self.on_connection_lost_callback()
-        
-        # Start loop and store stop function
-        self.read_loop_stop = self.adapter.startReadLoop(on_data, on_error)
+        # Start loop and store stop function; the JS loop decodes and splits
+        # lines and hands over one array of complete lines per chunk
+        self.read_loop_stop = self.adapter.startReadLoop(self._lines_proxy, self._error_proxy)
+    
+    def _on_serial_lines(self, lines):
+        """Handle the complete lines (JS array of strings) from one chunk"""
+        queue = self._rx_queue
+        loads = json.loads
+        put = queue.put_nowait
+        full = queue.full
+        for line in lines.to_py():
+            if line[0] not in JSON_START and line[0] > ' ':
+                continue
+            try:
+                message = loads(line)
+            except ValueError:
+                # Not valid JSON, ignore
+                continue
+            if not isinstance(message, dict):
+                continue
+            
+            if full():
+                # Keep the freshest data if the callbacks fall behind
+                queue.get_nowait()
+            put(message)
+    
+    def _on_serial_error(self, error):
+        """Handle read errors"""
+        self._connected = False
+        print(f"Serial read error: {error}")
+        if self.on_connection_lost_callback:
+            self.on_connection_lost_callback()
     
     async def _stop_json_read_loop(self):
         """Stop the JSON read loop and wait for cleanup to complete"""
         if self.read_loop_stop:
             print("🛑 Stopping JSON read loop...")
-            self.read_loop_stop()
+            stopped = self.read_loop_stop()
             self.read_loop_stop = None
             
-            # Wait for async cleanup to complete (reader.cancel() is async)
-            await asyncio.sleep(0.5)
+            # Resolves once the JS loop has cancelled and released its reader
+            await stopped
+            
+            # Let the dispatcher deliver anything already queued, then stop it
+            await asyncio.sleep(0)
+            if self._dispatch_task:
+                self._dispatch_task.cancel()
+                self._dispatch_task = None
             
             print("✅ JSON read loop stopped and cleaned up")
+    
+    async def _dispatch_messages(self, queue):
+        """Deliver queued messages to the data callbacks, one burst per wakeup"""
+        while True:
+            messages = [await queue.get()]
+            while not queue.empty():
+                messages.append(queue.get_nowait())
+            
+            # Hand the whole burst over in one call when a batch handler is set
+            if self.on_batch_data_callback:
+                try:
+                    self.on_batch_data_callback(messages)
+                except Exception as e:
+                    print(f"Serial data callback error: {e}")
+            elif self.on_data_callback:
+                # One failing message must not drop the rest of the burst
+                for message in messages:
+                    try:
+                        self.on_data_callback(message)
+                    except Exception as e:
+                        print(f"Serial data callback error: {e}")
 
@@ -17,8 +17,32 @@ Control Sequences:
 - Ctrl-E (\\x05): Enter paste mode
 """
 
-from pyscript import window
 import asyncio
+import re
+import time
+
+
+# Raw REPL output is "OK<stdout>\x04<stderr>\x04>" - the trailing "\x04>" ends it
+RAW_REPL_END = ('\x04>',)
+
+# Printed on entering raw REPL; ends with the raw prompt
+RAW_REPL_BANNER = ('raw REPL; CTRL-B to exit\r\n>',)
+
+# Normal REPL prompt
+NORMAL_PROMPT = ('>>> ',)
+
+# Paste mode's line prompt
+PASTE_MODE_PROMPT = ('=== ',)
+
+# Paste mode prints the results, then a fresh prompt
+PASTE_MODE_END = ('\n>>> ',)
+
+# The printed "MicroPython <version> on <date>; <machine>" line. It must start a
+# line (paste echo lines start with "===") and have no "{" (the f-string template)
+BOARD_INFO_RE = re.compile(r'^[ \t]*(MicroPython [^\r\n{]*on[^\r\n{]*)', re.M)
+
+# Either error marker, found in one scan of the stderr section
+ERROR_RE = re.compile(r'Traceback|Error:')
 
 
 class ReplController:
@@ -32,8 +56,20 @@ class ReplController:
             serial_connection: SerialConnection instance for I/O operations
         """
         self.serial = serial_connection
+        # Python-side clock for the timeout checks (no JS call like Date.now)
+        self._now = time.monotonic
+        # Extra delay between upload chunks; 0 relies on write backpressure alone.
+        # Set to 10 for UART-bridge boards without flow control (micro-repl's pacing)
+        self.chunk_pacing_ms = 0
+        # Raw-paste support is unknown until the first execute_raw_paste()
+        self.raw_paste_supported = None
         print("🔧 ReplController initialized")
     
+    def reset_device_state(self):
+        """Forget what was learned about the connected board (call on connect/disconnect)"""
+        # The next board may run firmware with or without raw-paste
+        self.raw_paste_supported = None
+    
     async def enter_repl_mode(self):
         """
         Stop JSON mode and get to normal REPL (>>> prompt).
@@ -48,23 +84,21 @@ class ReplController:
         # Stop JSON read loop (waits for cleanup to complete)
         await self.serial._stop_json_read_loop()
         
-        # Send multiple CTRL-C to interrupt any running code (main.py)
+        # Send multiple CTRL-C (in one write) to interrupt any running code (main.py)
         print("🛑 Interrupting running code with Ctrl-C...")
-        for i in range(3):
-            await self.serial.send_raw('\x03')  # Ctrl-C
-            await asyncio.sleep(0.05)
-        
-        # Wait for interruption to take effect
-        await asyncio.sleep(0.2)
+        await self.serial.send_raw('\x03\x03\x03')  # Ctrl-C x3
         
-        # Drain any existing output
+        # Drain existing output up to the prompt in one read (returns as soon
+        # as the interrupt lands instead of sleeping a fixed time first)
         print("🧹 Draining buffer...")
-        for i in range(5):
-            chunk = await self.serial.read_raw(200)
-            if chunk:
-                print(f"Drained: {chunk[:100]}")
+        found, drained = await self.serial.read_until(NORMAL_PROMPT, 1000)
+        if drained:
+            print(f"Drained: {drained[:100]}")
         
-        print("✅ Should now be at normal REPL (>>> prompt)")
+        if found:
+            print("✅ At normal REPL (>>> prompt)")
+        else:
+            print("✅ Should now be at normal REPL (>>> prompt)")
     
     async def enter_raw_repl_mode(self):
         """
@@ -80,16 +114,13 @@ class ReplController:
         # Send CTRL-A to enter raw REPL mode
         print("📤 Sending Ctrl-A to enter raw REPL...")
         await self.serial.send_raw('\x01')  # Ctrl-A
-        await asyncio.sleep(0.3)
         
-        # Wait for "raw REPL; CTRL-B to exit" prompt
-        result = await self.serial.adapter.readUntil('raw REPL', 5000)
+        # Wait for the whole "raw REPL; CTRL-B to exit\r\n>" banner, prompt included,
+        # so no welcome text is left to drain
+        found, _ = await self.serial.read_until(RAW_REPL_BANNER, 5000)
         
-        if result.found:
+        if found:
             print("✅ Entered raw REPL mode (> prompt)")
-            # Drain any remaining welcome text
-            for i in range(5):
-                await self.serial.read_raw(200)
         else:
             # Be lenient - continue anyway
             print("⚠️ May not have entered raw REPL properly")
@@ -105,11 +136,10 @@ class ReplController:
         print("Exiting raw REPL mode...")
         # Send CTRL-B to exit raw REPL
         await self.serial.send_raw('\x02')
-        await asyncio.sleep(0.2)
         
-        # Verify we got back to normal REPL
-        result = await self.serial.adapter.readUntil('>>>', 1000)
-        if result.found:
+        # Verify we got back to normal REPL (returns as soon as the prompt shows)
+        found, _ = await self.serial.read_until(NORMAL_PROMPT, 1000)
+        if found:
             print("✓ Exited to normal REPL mode (>>>)")
         else:
             print("⚠️ Exit may not have completed (no >>> prompt), continuing anyway")
@@ -125,9 +155,9 @@ class ReplController:
         4. Check for errors
         
         Args:
-            code: Python code to execute
+            code: Python code to execute (str, or UTF-8 bytes)
             timeout_ms: Maximum time to wait for response
-            chunk_size: If set, send code in chunks with delays (for older MicroPython)
+            chunk_size: If set, send code in drained chunks (for older MicroPython)
         
         Returns:
             str: Output from code execution
@@ -135,48 +165,91 @@ class ReplController:
         Raises:
             Exception: If execution errors or timeout
         """
-        start_time = window.Date.now()
+        start_time = self._now()
         
         try:
+            # Code followed by CTRL-D to execute, so both go out in the same write
+            data = code + (b'\x04' if isinstance(code, bytes) else '\x04')
+            
             # Write the code (chunked if requested for compatibility with older MicroPython)
             if chunk_size:
-                # Send in chunks with pacing to avoid buffer overflow on C3/older devices
+                # Send in chunks, each drained, to avoid buffer overflow on C3/older devices
                 print(f"Sending {len(code)} bytes in {chunk_size}-byte chunks...")
-                for i in range(0, len(code), chunk_size):
-                    chunk = code[i:i+chunk_size]
-                    await self.serial.send_raw(chunk)
-                    # 10ms delay between chunks (micro-repl's proven approach)
-                    await asyncio.sleep(0.01)
+                pacing = self.chunk_pacing_ms / 1000.0
+                for i in range(0, len(data), chunk_size):
+                    chunk = data[i:i+chunk_size]
+                    await self.serial.send_raw_drained(chunk)
+                    if pacing:
+                        await asyncio.sleep(pacing)
                 print(f"✓ All chunks sent")
-            else:
-                # Send all at once (fast path for newer MicroPython)
-                await self.serial.send_raw(code)
-            
-            # Send CTRL-D to execute
-            await self.serial.send_raw('\x04')
-            await asyncio.sleep(0.2)
-            
-            # Read response (try multiple times to get all output)
-            response = ''
-            for i in range(5):
-                if (window.Date.now() - start_time) > timeout_ms:
-                    raise Exception(f"REPL command timeout after {timeout_ms}ms")
                 
-                chunk = await self.serial.read_raw(1000)
-                response += chunk
-                if not chunk:
-                    break
-            
-            # Check for errors
-            if 'Traceback' in response or 'Error:' in response:
-                error_snippet = response[:200] if response else "Unknown error"
-                raise Exception(f"REPL execution error: {error_snippet}")
-            
+                # Read the whole response in one drain, stopping at the end marker
+                remaining = timeout_ms - (self._now() - start_time) * 1000
+                if remaining <= 0:
+                    raise Exception(f"REPL command timeout after {timeout_ms}ms")
+                found, response = await self.serial.read_until(RAW_REPL_END, remaining)
+            else:
+                # Send all at once and read up to the end marker in the same
+                # adapter call (fast path for newer MicroPython)
+                found, response = await self.serial.send_and_read_until(data, RAW_REPL_END, timeout_ms)
+            self._check_errors(found, response)
+            if not found:
+                # No closing "\x04>" - the output is truncated, not a result
+                raise Exception(f"REPL command timeout after {timeout_ms}ms: {response[-200:]!r}")
             return response
             
         except Exception as e:
             raise Exception(f"Failed to execute REPL command: {str(e)}")
     
+    async def execute_raw_paste(self, code, timeout_ms=5000, chunk_size=None):
+        """
+        Execute Python code via raw-paste mode, falling back to execute_command().
+        
+        Raw-paste (MicroPython 1.14+) streams the code under the device's own
+        flow control: no echo, no fixed pacing, and a single adapter call.
+        Devices that refuse it, or do not answer the handshake in time, are
+        remembered and use the plain raw REPL.
+        
+        Args:
+            code: Python code to execute (str, or UTF-8 bytes)
+            timeout_ms: Maximum time to wait for response
+            chunk_size: Chunk size for the execute_command() fallback
+        
+        Returns:
+            str: Output from code execution
+            
+        Raises:
+            Exception: If execution errors or timeout
+        """
+        if self.raw_paste_supported is not False:
+            try:
+                supported, found, response = await self.serial.raw_paste(code, timeout_ms)
+                if supported:
+                    self.raw_paste_supported = True
+                    self._check_errors(found, response)
+                    if not found:
+                        raise Exception(f"REPL command timeout after {timeout_ms}ms: {response[-200:]!r}")
+                    return response
+            except Exception as e:
+                raise Exception(f"Failed to execute REPL command: {str(e)}")
+            
+            print("⚠️ Raw-paste mode not supported, using raw REPL")
+            self.raw_paste_supported = False
+        
+        return await self.execute_command(code, timeout_ms=timeout_ms, chunk_size=chunk_size)
+    
+    def _check_errors(self, found, response):
+        """Raise if a raw REPL reply ("<stdout>\\x04<stderr>\\x04>") reports an error"""
+        # Only the stderr part between the two \x04's can hold errors,
+        # so skip scanning the (possibly large) stdout
+        errors = response
+        if found:
+            end = response.rfind('\x04>')
+            errors = response[response.rfind('\x04', 0, end) + 1:end]
+        if ERROR_RE.search(errors):
+            error_snippet = errors[:200]
+            raise Exception(f"REPL execution error: {error_snippet}")
+    
     async def get_board_info(self, timeout_ms=5000):
         """
         Get MicroPython version and board info using PASTE MODE.
@@ -194,27 +267,25 @@ class ReplController:
             Exception: If board info cannot be retrieved
         """
         print("🔍 Getting board info via paste mode...")
-        start_time = window.Date.now()
+        start_time = self._now()
         
         try:
             # Step 1: Reset to clean state
             print("🔍 Step 1: Resetting to clean state...")
             await self.serial.send_raw('\x02')  # Ctrl-B (exit raw REPL if in it)
-            await asyncio.sleep(0.2)
             await self.serial.send_raw('\x03\x03')  # Double Ctrl-C (interrupt any running code)
-            await asyncio.sleep(0.5)
             
-            # Step 2: Drain buffer to clear any pending output
+            # Step 2: Drain pending output up to the prompt
             print("🔍 Step 2: Draining buffer...")
-            for i in range(5):
-                chunk = await self.serial.read_raw(200)
-                if chunk:
-                    print(f"   Drained: {repr(chunk[:60])}")
+            _, drained = await self.serial.read_until(NORMAL_PROMPT, 1000)
+            if drained:
+                print(f"   Drained: {repr(drained[:60])}")
             
-            # Step 3: Enter paste mode (Ctrl-E)
+            # Step 3: Enter paste mode (Ctrl-E); its banner ends with the first
+            # "=== " prompt, and waiting for it also eats any late ">>> " prompts
             print("🔍 Step 3: Entering paste mode (Ctrl-E)...")
             await self.serial.send_raw('\x05')  # Ctrl-E
-            await asyncio.sleep(0.3)
+            await self.serial.read_until(PASTE_MODE_PROMPT, 1000)
             
             # Step 4: Send Python code to get version and machine info
             print("🔍 Step 4: Sending Python code to get version...")
@@ -227,47 +298,28 @@ print(f"MicroPython {u.version}; {u.machine}")
             # Step 5: Execute the code (Ctrl-D in paste mode)
             print("🔍 Step 5: Executing code (Ctrl-D)...")
             await self.serial.send_raw('\x04')  # Ctrl-D
-            await asyncio.sleep(0.8)
             
-            # Step 6: Collect response
-            response = ''
+            # Step 6: Collect response in one drain. The echoed code already
+            # contains "MicroPython ", so wait for the prompt printed after the output
             print("🔍 Step 6: Collecting response...")
-            for i in range(15):
-                if (window.Date.now() - start_time) > timeout_ms:
-                    print(f"❌ Timeout after {timeout_ms}ms. Received so far: {repr(response[:200])}")
-                    raise Exception(f"Timeout waiting for board info ({timeout_ms}ms)")
-                
-                chunk = await self.serial.read_raw(500)
-                if chunk:
-                    print(f"   Got chunk ({len(chunk)} bytes): {repr(chunk[:80])}")
-                    response += chunk
-                
-                # Stop if we found MicroPython version
-                if 'MicroPython' in response:
-                    print(f"✅ Found MicroPython version string!")
-                    break
-                
-                # Stop if no more data
-                if not chunk:
-                    break
+            remaining = timeout_ms - (self._now() - start_time) * 1000
+            if remaining <= 0:
+                raise Exception(f"Timeout waiting for board info ({timeout_ms}ms)")
+            found, response = await self.serial.read_until(PASTE_MODE_END, remaining)
+            if found:
+                print(f"✅ Got response ({len(response)} bytes)")
+            else:
+                print(f"⚠️ No prompt after {timeout_ms}ms. Received so far: {repr(response[:200])}")
             
             # Step 7: Parse version from response
             print("🔍 Step 7: Parsing version from response...")
-            if 'MicroPython' in response:
-                lines = response.split('\n')
-                for line in lines:
-                    # Look for the actual output line (not echoed code)
-                    # Valid lines start with "MicroPython " followed by version or git hash
-                    # Skip lines that are paste mode echo (contain "===", "print(", etc.)
-                    stripped = line.strip()
-                    if (stripped.startswith('MicroPython ') and 
-                        'on' in line and
-                        '===' not in line and
-                        'print(' not in line and
-                        '{' not in line):  # Skip f-string template
-                        board_info = stripped
-                        print(f"✅ Board detected: {board_info}")
-                        return board_info
+            # The output follows the last "===" paste echo line, so only that tail is searched
+            output = response[response.rfind('===') + 1:]
+            match = BOARD_INFO_RE.search(output)
+            if match:
+                board_info = match.group(1).strip()
+                print(f"✅ Board detected: {board_info}")
+                return board_info
             
             # Didn't find MicroPython version in output
             print(f"❌ No MicroPython version found in response")
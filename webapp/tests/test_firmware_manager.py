@@ -0,0 +1,91 @@
+"""
+Tests for mpy/firmware_manager.py (run from webapp/: python -m unittest discover tests)
+
+The REPL controller is replaced by a recorder, so no board or browser is needed.
+"""
+
+import asyncio
+import binascii
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mpy.firmware_manager import FirmwareManager, UPLOAD_PIECE_SIZE
+
+
+class FakeSerial:
+    """Records raw writes"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_raw(self, data):
+        self.sent.append(data)
+
+
+class FakeRepl:
+    """Records every REPL call and runs upload code against an in-memory file"""
+
+    def __init__(self):
+        self.serial = FakeSerial()
+        self.commands = []
+        self.raw_pastes = []
+
+    async def execute_command(self, code, timeout_ms=5000, chunk_size=None):
+        self.commands.append(code)
+        return 'OK'
+
+    async def execute_raw_paste(self, code, timeout_ms=5000, chunk_size=None):
+        if isinstance(code, bytes):
+            code = code.decode('utf-8')
+        self.raw_pastes.append(code)
+        return 'OK' if 'print(' in code else ''
+
+
+def decoded_pieces(pastes):
+    """File bytes written by the f.write(a2b_base64(...)) calls, in order"""
+    data = b''
+    for code in pastes:
+        if ".write(a2b_base64(b'" in code:
+            b64 = code.split("b'")[1].split("'")[0]
+            data += binascii.a2b_base64(b64)
+    return data
+
+
+class UploadTest(unittest.TestCase):
+
+    def test_one_call_per_piece(self):
+        repl = FakeRepl()
+        content = 'héllo\n' * 2000   # 14000 UTF-8 bytes -> 5 pieces
+        asyncio.run(FirmwareManager(repl).upload_single_file('main.py', content))
+
+        pieces = -(-len(content.encode('utf-8')) // UPLOAD_PIECE_SIZE)
+        self.assertEqual(len(repl.raw_pastes), pieces + 2)
+        self.assertIn("open('main.py', 'wb')", repl.raw_pastes[0])
+        self.assertIn('.close()', repl.raw_pastes[-1])
+        self.assertEqual(decoded_pieces(repl.raw_pastes).decode('utf-8'), content)
+
+    def test_empty_file(self):
+        repl = FakeRepl()
+        asyncio.run(FirmwareManager(repl).upload_single_file('empty.py', ''))
+
+        self.assertEqual(len(repl.raw_pastes), 2)
+        self.assertEqual(decoded_pieces(repl.raw_pastes), b'')
+
+
+class StartMainTest(unittest.TestCase):
+
+    def test_start_main_does_not_wait_for_a_reply(self):
+        # The hub firmware never returns to a prompt, so the tail of an upload
+        # must not go through execute_command (which raises without "\x04>")
+        repl = FakeRepl()
+        asyncio.run(FirmwareManager(repl).start_main())
+
+        self.assertEqual(repl.serial.sent, ['import main\r'])
+        self.assertEqual(repl.commands, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
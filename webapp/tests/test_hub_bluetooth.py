@@ -0,0 +1,77 @@
+"""
+Tests for mpy/hub_bluetooth.py notification handling (run from webapp/:
+python -m unittest discover tests)
+
+pyscript and pyodide only exist in the browser, so minimal stand-ins are
+registered before the module is imported.
+"""
+
+import os
+import sys
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+if 'pyscript' not in sys.modules:
+    sys.modules['pyscript'] = types.SimpleNamespace(
+        window=types.SimpleNamespace(bluetoothAdapter=object()))
+if 'pyodide.ffi' not in sys.modules:
+    sys.modules['pyodide'] = types.ModuleType('pyodide')
+    sys.modules['pyodide.ffi'] = types.SimpleNamespace(
+        to_js=lambda value: value, create_proxy=lambda fn: fn)
+
+from mpy.hub_bluetooth import BluetoothConnection
+
+
+def make_connection():
+    """Connection with a recording data callback and fresh receive state"""
+    ble = BluetoothConnection()
+    ble._rx = ''
+    ble._frame_left = 0
+    ble._frame_header = ''
+    received = []
+    ble.on_data_callback = received.append
+    return ble, received
+
+
+class NotificationTest(unittest.TestCase):
+
+    def test_json_line_split_across_notifications(self):
+        ble, received = make_connection()
+        ble._on_notification('{"type":"devices","l')
+        self.assertEqual(received, [])
+
+        ble._on_notification('ist":[{"mac":"aa"}]}\n')
+        self.assertEqual(received, [{"type": "devices", "list": [{"mac": "aa"}]}])
+
+    def test_framed_payload_passes_through(self):
+        ble, received = make_connection()
+        # Payload fragments start with "{" and carry no newline; they belong
+        # to the frame, so they must reach the callback instead of the line buffer
+        fragments = ['MSG:20|', '{"type":"ack","st', 'at":1}']
+        for fragment in fragments:
+            ble._on_notification(fragment)
+        self.assertEqual(received, fragments)
+        self.assertEqual(ble._frame_left, 0)
+
+        # After the frame, a split JSON line is buffered again
+        ble._on_notification('{"a":')
+        ble._on_notification('1}\n')
+        self.assertEqual(received[-1], {"a": 1})
+
+    def test_frame_header_split_across_notifications(self):
+        ble, received = make_connection()
+        for fragment in ['MSG:1', '2|{"x":', '123456}']:
+            ble._on_notification(fragment)
+        self.assertEqual(len(received), 3)
+        self.assertEqual(ble._frame_left, 0)
+
+    def test_plain_text_passes_through(self):
+        ble, received = make_connection()
+        ble._on_notification('Hub ready')
+        self.assertEqual(received, ['Hub ready'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Tests for mpy/hub_serial.py send coalescing (run from webapp/:
+python -m unittest discover tests)
+
+pyscript and pyodide only exist in the browser, so minimal stand-ins are
+registered before the module is imported.
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+class FakeAdapter:
+    """Records writes; fails them while ``error`` is set"""
+
+    def __init__(self):
+        self.writes = []
+        self.error = None
+
+    async def write(self, data):
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        self.writes.append(data)
+
+    def __getattr__(self, name):
+        # Adapter methods these tests never call
+        return None
+
+
+if 'pyscript' not in sys.modules:
+    sys.modules['pyscript'] = types.SimpleNamespace(window=types.SimpleNamespace())
+if 'pyodide.ffi' not in sys.modules:
+    sys.modules['pyodide'] = types.ModuleType('pyodide')
+    sys.modules['pyodide.ffi'] = types.SimpleNamespace(
+        to_js=lambda value: value, create_proxy=lambda fn: fn)
+
+from mpy import hub_serial
+from mpy.hub_serial import SerialConnection
+
+
+def make_connection():
+    """Connection over a fresh recording adapter"""
+    adapter = FakeAdapter()
+    hub_serial.window.serialAdapter = adapter
+    return SerialConnection(), adapter
+
+
+class SendJsonTest(unittest.TestCase):
+
+    def test_sends_in_one_turn_share_a_write(self):
+        serial, adapter = make_connection()
+
+        async def run():
+            return await asyncio.gather(
+                serial.send_json({"cmd": "PING", "rssi": "all"}),
+                serial.send_json('{"cmd":"play"}'))
+
+        self.assertEqual(asyncio.run(run()), [True, True])
+        self.assertEqual(adapter.writes,
+                         ['{"cmd":"PING","rssi":"all"}\n{"cmd":"play"}\n'])
+
+    def test_failed_flush_is_retrieved_when_every_sender_is_cancelled(self):
+        serial, adapter = make_connection()
+        adapter.error = Exception("port gone")
+        unretrieved = []
+
+        async def run():
+            asyncio.get_running_loop().set_exception_handler(
+                lambda loop, context: unretrieved.append(context))
+            sender = asyncio.ensure_future(serial.send_json({"cmd": "PING"}))
+            await asyncio.sleep(0)
+            flush = serial._tx_flush
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            # asyncio.wait does not read the exception, unlike awaiting it
+            await asyncio.wait([flush])
+            await asyncio.sleep(0)
+            # A task whose exception was never read reports it when collected
+            del flush
+            gc.collect()
+
+        asyncio.run(run())
+        self.assertEqual(unretrieved, [])
+        self.assertIsNone(serial._tx_flush)
+
+
+if __name__ == '__main__':
+    unittest.main()
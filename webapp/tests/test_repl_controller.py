@@ -0,0 +1,64 @@
+"""
+Tests for mpy/repl_controller.py raw-paste fallback (run from webapp/:
+python -m unittest discover tests)
+
+The serial connection is replaced by a recorder, so no board or browser is needed.
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mpy.repl_controller import ReplController
+
+
+class FakeSerial:
+    """Answers raw_paste with a fixed result and records raw REPL sends"""
+
+    def __init__(self, raw_paste_result):
+        self.raw_paste_result = raw_paste_result
+        self.raw_pastes = 0
+        self.sent = []
+
+    async def raw_paste(self, code, timeout_ms=5000):
+        self.raw_pastes += 1
+        return self.raw_paste_result
+
+    async def send_and_read_until(self, data, markers, timeout_ms):
+        self.sent.append(data)
+        return True, 'OKdone\x04\x04>'
+
+
+class RawPasteFallbackTest(unittest.TestCase):
+
+    def test_handshake_timeout_falls_back_and_is_remembered(self):
+        # The adapter reports a handshake with no reply as unsupported
+        serial = FakeSerial((False, False, ''))
+        repl = ReplController(serial)
+
+        response = asyncio.run(repl.execute_raw_paste("print('done')"))
+        self.assertIn('done', response)
+        self.assertIs(repl.raw_paste_supported, False)
+        self.assertEqual(serial.sent, ["print('done')\x04"])
+
+        # Later calls go straight to the raw REPL
+        asyncio.run(repl.execute_raw_paste("print('done')"))
+        self.assertEqual(serial.raw_pastes, 1)
+
+    def test_reset_device_state_retries_raw_paste(self):
+        serial = FakeSerial((False, False, ''))
+        repl = ReplController(serial)
+        asyncio.run(repl.execute_raw_paste("print('done')"))
+
+        repl.reset_device_state()
+        serial.raw_paste_result = (True, True, 'OKdone\x04\x04>')
+        asyncio.run(repl.execute_raw_paste("print('done')"))
+        self.assertIs(repl.raw_paste_supported, True)
+        self.assertEqual(serial.raw_pastes, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()